@@ -0,0 +1,55 @@
+"""自适应采样间隔
+
+刚观察到变化时按最短间隔采样；快照连续没有变化或用户空闲时按倍数逐步放慢，
+直到最长间隔；屏幕锁定时降到最低频率。减少采样线程自身的 CPU 占用和唤醒次数。
+
+空闲时间和锁屏状态由平台后端的 idle_seconds() / is_locked() 提供（见 platforms.py）。
+"""
+
+
+class AdaptiveInterval:
+    """根据变化、空闲和锁屏状态计算下一次采样前的等待时间
+
+    Args:
+        min_interval: 最短间隔（秒），观察到变化后使用
+        max_interval: 没有变化或空闲时逐步放慢到的最长间隔（秒）
+        locked_interval: 锁屏时的间隔（秒）
+        idle_threshold: 超过这么久没有输入视为空闲（秒）
+        backoff: 每次没有变化时间隔乘以的倍数
+    """
+
+    def __init__(self, min_interval, max_interval, locked_interval, idle_threshold, backoff=2.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.locked_interval = locked_interval
+        self.idle_threshold = idle_threshold
+        self.backoff = backoff
+        self.interval = min_interval
+        self.state = 'active'  # active / idle / locked
+
+    def next(self, changed, idle_seconds=0.0, locked=False):
+        """根据本次采样的结果计算下一次的间隔
+
+        Args:
+            changed: 本次采样是否观察到变化
+            idle_seconds: 用户空闲的秒数
+            locked: 屏幕是否锁定
+
+        Returns:
+            float: 等待的秒数
+        """
+        max_interval = max(self.max_interval, self.min_interval)
+        if locked:
+            self.state = 'locked'
+            self.interval = max(self.locked_interval, max_interval)
+        elif idle_seconds >= self.idle_threshold:
+            # 空闲时的变化多半来自后台（播放器、下载进度等），不必加快采样
+            self.state = 'idle'
+            self.interval = min(max(self.interval, self.min_interval) * self.backoff, max_interval)
+        elif changed:
+            self.state = 'active'
+            self.interval = self.min_interval
+        else:
+            self.state = 'active'
+            self.interval = min(max(self.interval, self.min_interval) * self.backoff, max_interval)
+        return self.interval
@@ -1,156 +1,307 @@
-import json
-from flask import Flask, render_template, jsonify, request
-import psutil
-import win32gui
-import win32process
+from flask import Flask, render_template, jsonify, request, Response, url_for, g
 import datetime
-import sqlite3
 import time
-import config
+import threading
+import queue
+import collections
+import base64
 import os
+import config
 from functools import wraps
+from snapshot import SnapshotEngine
+from sessions import OpenSessionTable
+from writer import BatchWriter
+import database
+import migrations
+import reports
+import rollups
+import export
+import archive
+import retention
+import metrics
+import profiler
+from coalescing import TitleNormalizer, SessionDebouncer
+from adaptive import AdaptiveInterval
+from database import pool as db_pool
+from settings_store import SettingsCache, NameRegistry
+from events import EventBroadcaster, format_sse, diff_running_apps, RESYNC
+from foreground import ForegroundTracker, ReplayEventSource
+import platforms
 
 app = Flask(__name__)
-DATABASE = 'app_usage.db'
 
-def get_db_connection():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
+def create_platform_backend():
+    """根据配置创建平台后端，加载失败时退回到不采集数据的 'none'
+
+    只有被选中的后端模块会被导入，'none' 不需要 pywin32 或 X11
+    """
+    options = {}
+    if config.PLATFORM == 'fake':
+        options = {'num_processes': config.SYNTHETIC_PROCESSES,
+                   'windows_per_process': config.SYNTHETIC_WINDOWS_PER_PROCESS}
+    try:
+        return platforms.load_backend(config.PLATFORM, **options)
+    except Exception as e:
+        print(f"平台后端 {config.PLATFORM} 不可用，只提供历史数据查询: {e}")
+        return platforms.HeadlessBackend()
+
+platform_backend = create_platform_backend()
+snapshot_engine = SnapshotEngine(platform_backend)
+process_cache = snapshot_engine.cache  # 进程信息缓存，采样线程和前台跟踪线程共用
+open_sessions = OpenSessionTable()  # 内存中的未结束会话，只由采样线程读写
+session_debouncer = SessionDebouncer()  # 标题去抖，只由采样线程使用
+batch_writer = BatchWriter(database.connect)  # 采样线程专用的批量写入器
+
+broadcaster = EventBroadcaster()  # 向 /stream 的客户端推送变化
+cleanup_progress = retention.CleanupProgress()  # 清理任务的进度和耗时
+
+# 性能指标（/metrics），只在内存中累计
+tick_seconds = metrics.histogram('app_monitor_tick_seconds', '一次采样各阶段的耗时（秒）', ['phase'])
+tick_errors = metrics.counter('app_monitor_tick_errors_total', '失败的采样次数')
+rows_written = metrics.counter('app_monitor_rows_written_total', '写入数据库的变化数', ['kind'])
+commit_seconds = metrics.histogram('app_monitor_db_commit_seconds', '批量写入事务的耗时（秒）')
+cleanup_seconds = metrics.histogram('app_monitor_cleanup_seconds', '数据清理任务的耗时（秒）', ['task'],
+                                    buckets=(0.01, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900))
+cleanup_rows = metrics.counter('app_monitor_cleanup_rows_deleted_total', '清理任务删除的行数', ['table'])
+request_seconds = metrics.histogram('app_monitor_http_request_seconds', 'HTTP 请求的处理耗时（秒）',
+                                    ['route', 'method'])
+requests_total = metrics.counter('app_monitor_http_requests_total', 'HTTP 请求数', ['route', 'method', 'status'])
+metrics.gauge('app_monitor_open_sessions', '内存中未结束的会话数', lambda: len(open_sessions.sessions))
+metrics.gauge('app_monitor_process_cache_size', '进程信息缓存的条目数', lambda: process_cache.stats()['size'])
+metrics.gauge('app_monitor_process_cache_hit_ratio', '进程信息缓存的命中率', lambda: process_cache.stats()['hit_rate'])
+metrics.gauge('app_monitor_sample_interval_seconds', '当前的采样间隔（秒）',
+              lambda: (get_latest_snapshot()['sampler'] or {}).get('interval'))
+
+def create_foreground_tracker():
+    """根据配置创建前台窗口跟踪器，系统事件钩子不可用时退回到轮询
+
+    FOREGROUND_TRACKING 为 'none' 或平台后端不能采集数据时不跟踪前台窗口
+    """
+    if config.FOREGROUND_TRACKING == 'none' or not platform_backend.can_collect:
+        return ForegroundTracker(ReplayEventSource([]), resolve_process_name=process_cache.process_name)
+    source, fallback = platform_backend.foreground_sources(config.FOREGROUND_TRACKING == 'hook',
+                                                           config.FOREGROUND_POLL_INTERVAL)
+    return ForegroundTracker(source, fallback=fallback, resolve_process_name=process_cache.process_name)
+
+foreground_tracker = create_foreground_tracker()
+sampler_wakeup = threading.Event()  # 前台切换时立即唤醒采样线程
+sampler_pacing = AdaptiveInterval(config.SAMPLE_INTERVAL_SECONDS, config.SAMPLE_INTERVAL_MAX_SECONDS,
+                                  config.SAMPLE_INTERVAL_LOCKED_SECONDS, config.IDLE_THRESHOLD_SECONDS,
+                                  config.SAMPLE_BACKOFF)  # 自适应采样间隔，只由采样线程使用
+titles_prune_requested = threading.Event()  # 清理后由采样线程删除不再被引用的窗口标题
+focus_changes = collections.deque()  # 跟踪器记录的焦点切换，由采样线程写入 focus_intervals
+_last_focus = None  # 最近一次写入的焦点 (process_name, window_title)，只由采样线程读写
+
+def _on_foreground_change(current, previous):
+    """记录焦点切换；切换到另一个窗口时唤醒采样线程（同一窗口的标题变化等下一次采样处理）"""
+    focus_changes.append(current)
+    if previous is None or current['hwnd'] != previous['hwnd']:
+        sampler_wakeup.set()
+
+foreground_tracker.add_listener(_on_foreground_change)
+
+# 后台采样线程发布的最新快照，HTTP 路由只读取这里的数据
+_snapshot_lock = threading.Lock()
+latest_snapshot = {
+    'running_apps': [],
+    'foreground_app': {"process_name": "None", "window_title": "None", "raw_name": None},
+    'updated_at': None,
+    'last_write': None,
+    'sampler': None  # 当前的采样间隔、空闲时间和锁屏状态
+}
+
+# 设置缓存：settings.json 变化时才重新读取
+settings_cache = SettingsCache(config.CONFIG_FILE, {
+    'monitoring_enabled': config.MONITORING_ENABLED,
+    'ignore_title_changes': config.IGNORE_TITLE_CHANGES,
+    'ignored_apps': config.IGNORED_APPS,
+    'custom_names': {},
+    'hidden_from_web': config.HIDDEN_FROM_WEB,
+    'hidden_app_display': config.HIDDEN_APP_DISPLAY,
+    'sample_interval': config.SAMPLE_INTERVAL_SECONDS,
+    'sample_interval_max': config.SAMPLE_INTERVAL_MAX_SECONDS,
+    'sample_interval_locked': config.SAMPLE_INTERVAL_LOCKED_SECONDS,
+    'idle_threshold': config.IDLE_THRESHOLD_SECONDS,
+    'title_rules': {},
+    'title_min_dwell': config.TITLE_MIN_DWELL_SECONDS,
+    'title_flap_seconds': config.TITLE_FLAP_SECONDS,
+    'profile_seconds': 0
+}, on_reload=lambda old, new: _on_settings_reload(old, new))
+# 由 _on_settings_reload 随设置一起重建
+name_registry = NameRegistry(config.APP_DISPLAY_NAMES, {})
+title_normalizer = TitleNormalizer(config.TITLE_RULES)
 
 def load_config():
-    """加载配置文件"""
-    default_settings = {
-        'monitoring_enabled': config.MONITORING_ENABLED,
-        'ignore_title_changes': config.IGNORE_TITLE_CHANGES,
-        'ignored_apps': config.IGNORED_APPS,
-        'custom_names': {},
-        'hidden_from_web': config.HIDDEN_FROM_WEB,
-        'hidden_app_display': config.HIDDEN_APP_DISPLAY
-    }
-    
+    """加载配置（文件未变化时直接返回缓存的只读设置）"""
+    return settings_cache.get()
+
+def _on_settings_reload(old_settings, new_settings):
+    """设置重新加载后重建名称映射和标题规则，只有隐藏列表变化时才清除被隐藏应用的历史数据"""
+    global name_registry, title_normalizer
+    name_registry = NameRegistry(config.APP_DISPLAY_NAMES, new_settings['custom_names'])
+    process_cache.set_display_name(name_registry.display_name)
+    title_rules = dict(config.TITLE_RULES)
+    title_rules.update(new_settings['title_rules'])
+    title_normalizer = TitleNormalizer(title_rules)
+
+    # 运行期间 profile_seconds 改为另一个正数时分析一次采样线程（启动时读取到的值不会触发分析）
+    profile_seconds = new_settings['profile_seconds']
+    if (old_settings is not None and old_settings['profile_seconds'] != profile_seconds
+            and profile_seconds > 0):
+        try:
+            start_collector_profile(profile_seconds)
+        except RuntimeError as e:
+            print(f"无法开始性能分析: {e}")
+
+    hidden_apps = new_settings['hidden_from_web']
+    if old_settings is not None and old_settings['hidden_from_web'] == hidden_apps:
+        return
+    # 在后台线程中清除，不阻塞读取设置的采样线程或请求
+    threading.Thread(target=_clean_hidden_apps_in_background, args=(hidden_apps,), daemon=True).start()
+
+SAMPLER_THREAD_NAME = 'sampler'
+collector_profiler = None  # 最近一次的采样线程性能分析
+_profiler_lock = threading.Lock()
+
+def start_collector_profile(seconds):
+    """开始对采样线程做 seconds 秒的栈采样分析，结果写在数据库文件所在的目录
+
+    已经在分析或当前平台不采集数据时抛出 RuntimeError
+    """
+    global collector_profiler
+    if not platform_backend.can_collect:
+        raise RuntimeError("当前平台后端不采集数据")
     try:
-        if os.path.exists(config.CONFIG_FILE):
-            with open(config.CONFIG_FILE, 'r', encoding='utf-8') as f:
-                saved_settings = json.load(f)
-                # 合并保存的设置和默认设置
-                settings = default_settings.copy()
-                settings.update(saved_settings)
-                # 清除被隐藏应用的历史数据
-                clean_hidden_apps_data(settings.get('hidden_from_web', []))
-                return settings
+        seconds = min(float(seconds), config.PROFILE_MAX_SECONDS)
+    except (TypeError, ValueError):
+        raise RuntimeError(f"无效的分析时长: {seconds!r}")
+    if seconds <= 0:
+        raise RuntimeError("分析时长必须大于 0")
+    with _profiler_lock:
+        if collector_profiler is not None and collector_profiler.running:
+            raise RuntimeError("性能分析正在进行")
+        output_dir = os.path.dirname(os.path.abspath(database.DATABASE))
+        collector_profiler = profiler.SamplingProfiler(SAMPLER_THREAD_NAME, seconds,
+                                                       config.PROFILE_INTERVAL_SECONDS, output_dir)
+        collector_profiler.start()
+    print(f"开始分析采样线程，持续 {seconds:g} 秒")
+    return collector_profiler
+
+def record_cleanup(run):
+    """记录一次清理任务的耗时和删除的行数"""
+    stats = run.to_dict()
+    cleanup_seconds.observe(stats['elapsed_ms'] / 1000, stats['task'])
+    for table, count in stats['deleted'].items():
+        if count:
+            cleanup_rows.inc(table, amount=count)
+
+def _clean_hidden_apps_in_background(hidden_apps):
+    try:
+        clean_hidden_apps_data(hidden_apps)
     except Exception as e:
-        print(f"加载配置文件失败: {e}")
-    return default_settings
+        print(f"清除隐藏应用数据失败: {e}")
 
 def clean_hidden_apps_data(hidden_apps):
-    """清除被隐藏应用的历史数据"""
+    """清除被隐藏应用的历史数据（与定时清理一样分批删除，不会长时间锁住数据库）"""
     if not hidden_apps:
         return
-        
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # 构建 SQL 查询
-    placeholders = ','.join('?' * len(hidden_apps))
-    cursor.execute(f"""
-        DELETE FROM app_usage 
-        WHERE process_name IN ({placeholders})
-    """, hidden_apps)
-    
-    conn.commit()
-    conn.close()
+
+    run = cleanup_progress.start('hidden_apps')
+    try:
+        with db_pool.connection() as conn:
+            placeholders = ','.join('?' * len(hidden_apps))
+            for table in ('app_usage', 'focus_intervals', 'usage_hourly', 'usage_daily'):
+                retention.delete_where(
+                    conn, table,
+                    f"process_id IN (SELECT id FROM processes WHERE name IN ({placeholders}))",
+                    list(hidden_apps), run
+                )
+            retention.incremental_vacuum(conn, run)
+    finally:
+        cleanup_progress.finish(run)
+        record_cleanup(run)
+    request_title_prune()
     print(f"已清除被隐藏应用的历史数据")
 
+def request_title_prune():
+    """请求删除不再被引用的窗口标题
+
+    标题缓存属于采样线程的批量写入器，删除要在采样线程中执行才能同时清空缓存；
+    没有采样线程时（平台后端不采集数据）直接在当前线程执行
+    """
+    if platform_backend.can_collect:
+        titles_prune_requested.set()
+    else:
+        prune_unused_titles()
+
+def prune_unused_titles():
+    """删除不再被引用的窗口标题（在使用 batch_writer 的线程中调用）"""
+    titles_prune_requested.clear()
+    run = cleanup_progress.start('titles')
+    try:
+        batch_writer.prune_titles(run)
+    finally:
+        cleanup_progress.finish(run)
+        record_cleanup(run)
+
 def create_table():
-    """创建数据库表"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS app_usage (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            process_name TEXT,
-            window_title TEXT,
-            start_time TEXT,
-            end_time TEXT,
-            is_foreground INTEGER  -- 1 表示前台, 0 表示后台
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-def insert_data(process_name, window_title, start_time, is_foreground):
-    """插入数据到数据库"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO app_usage (process_name, window_title, start_time, end_time, is_foreground)
-        VALUES (?, ?, ?, NULL, ?)
-    ''', (process_name, window_title, start_time.isoformat(), is_foreground))
-    conn.commit()
-    conn.close()
-
-def update_end_time(process_name, window_title):
-    """更新进程的结束时间"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    now = datetime.datetime.now().isoformat()
-    cursor.execute('''
-        UPDATE app_usage
-        SET end_time = ?
-        WHERE process_name = ? AND window_title = ? AND end_time IS NULL
-    ''', (now, process_name, window_title))
-    conn.commit()
-    conn.close()
+    """初始化数据库：启用增量空间回收和 WAL 模式并执行结构迁移（启动时执行一次）"""
+    with db_pool.connection() as conn:
+        retention.enable_incremental_vacuum(conn)
+        database.enable_wal(conn)
+        migrations.migrate(conn)
+        # 上次运行没有正常结束的前台区间无法知道真实的结束时间，按零长度处理
+        conn.execute("UPDATE focus_intervals SET end_time = start_time WHERE end_time IS NULL")
+        conn.commit()
+
+def get_name_registry():
+    """获取当前设置对应的名称映射（设置变化时才重建）"""
+    load_config()
+    return name_registry
+
+def get_title_normalizer():
+    """获取当前设置对应的标题规范化规则（设置变化时才重建）"""
+    load_config()
+    return title_normalizer
 
 def get_display_name(process_name):
     """获取应用程序的显示名称"""
-    return config.APP_DISPLAY_NAMES.get(process_name, process_name)
+    return get_name_registry().display_name(process_name)
 
 def get_running_applications():
     """获取当前运行的所有应用程序信息
     
     返回一个列表，每个元素包含：
     - process_name: 进程名称（可能是自定义的显示名称）
+    - raw_name: 原始进程名称
+    - pid: 进程 ID
     - window_titles: 该进程的所有窗口标题
     - process_start_time: 进程启动时间
     """
     settings = load_config()
     app_list = []
-    for process in psutil.process_iter(['pid', 'name', 'create_time']):
-        try:
-            process_name = process.info['name']
-            
-            # 跳过被忽略或隐藏的应用
-            if process_name in settings['ignored_apps'] or process_name in settings['hidden_from_web']:
-                continue
-                
-            process_start_time = datetime.datetime.fromtimestamp(process.info['create_time']).strftime("%Y-%m-%d %H:%M:%S")
-            display_name = get_display_name(process_name)
-
-            # 获取这个进程的所有窗口标题
-            def callback(hwnd, window_titles):
-                if win32gui.IsWindowVisible(hwnd) and win32process.GetWindowThreadProcessId(hwnd)[1] == process.info['pid']:
-                     window_title = win32gui.GetWindowText(hwnd)
-                     if window_title:
-                         window_titles.append(window_title)
-
-            window_titles = []
-            win32gui.EnumWindows(callback, window_titles)
-
-            # 只记录有窗口的应用程序
-            if window_titles:
-                # 如果设置了忽略标题变化，只保留第一个标题
-                if process_name in settings['ignore_title_changes']:
-                    window_titles = window_titles[:1]
-                app_list.append({
-                    "process_name": display_name,
-                    "window_titles": window_titles,
-                    "process_start_time": process_start_time
-                })
-
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            pass
+    # 一次枚举所有窗口，只为拥有窗口的进程解析进程信息（已解析过的进程直接使用缓存）
+    for process in snapshot_engine.take():
+        process_name = process['process_name']
+
+        # 跳过被忽略或隐藏的应用
+        if process_name in settings['ignored_apps'] or process_name in settings['hidden_from_web']:
+            continue
+
+        process_start_time = process['process_start_time']
+        display_name = process['display_name']
+        window_titles = process['window_titles']
+
+        # 如果设置了忽略标题变化，只保留第一个标题
+        if process_name in settings['ignore_title_changes']:
+            window_titles = window_titles[:1]
+        app_list.append({
+            "process_name": display_name,
+            "raw_name": process_name,
+            "pid": process['pid'],
+            "window_titles": window_titles,
+            "process_start_time": process_start_time
+        })
 
     return app_list
 
@@ -160,154 +311,291 @@ def get_foreground_window_info():
     返回一个字典，包含：
     - process_name: 进程名称（可能是自定义的显示名称）
     - window_title: 窗口标题
+    - raw_name: 原始进程名称，没有可记录的前台应用时为 None
     
-    如果是隐藏的应用，会返回配置中设置的替代显示文本
+    如果是隐藏的应用，会返回配置中设置的替代显示文本，raw_name 为 None
+    
+    前台窗口由事件驱动的跟踪器维护，这里只读取它的当前状态
     """
     settings = load_config()
-    hwnd = win32gui.GetForegroundWindow()
-    if hwnd and settings['monitoring_enabled']:
+    current = foreground_tracker.current
+    if current and current['hwnd'] and settings['monitoring_enabled']:
         try:
-            thread_id, process_id = win32process.GetWindowThreadProcessId(hwnd)
-            process = psutil.Process(process_id)
-            process_name = process.name()
+            process_name = current['process_name']
+            if process_name is None:
+                return {"process_name": "Unknown", "window_title": "Unknown", "raw_name": None}
             
             # 如果是被忽略的应用，返回空值
             if process_name in settings['ignored_apps']:
-                return {"process_name": "None", "window_title": "None"}
+                return {"process_name": "None", "window_title": "None", "raw_name": None}
             
             # 如果是隐藏的应用，返回自定义显示文本
-            if process_name in settings.get('hidden_from_web', []):
+            if process_name in settings['hidden_from_web']:
                 hidden_display = settings.get('hidden_app_display', config.HIDDEN_APP_DISPLAY)
                 return {
                     "process_name": hidden_display.get('process_name', '其他应用'),
-                    "window_title": hidden_display.get('window_title', '工作中')
+                    "window_title": hidden_display.get('window_title', '工作中'),
+                    "raw_name": None
                 }
                 
-            window_title = win32gui.GetWindowText(hwnd)
-            display_name = get_display_name(process_name)
+            window_title = current['window_title']
+            display_name = get_name_registry().display_name(process_name)
             
             # 如果设置了忽略标题变化，窗口标题显示为进程名
             if process_name in settings['ignore_title_changes']:
                 window_title = display_name
                 
-            return {"process_name": display_name, "window_title": window_title}
-        except psutil.NoSuchProcess:
-            return {"process_name": "Unknown", "window_title": "Unknown"}
+            return {"process_name": display_name, "window_title": window_title, "raw_name": process_name}
         except Exception as e:
             print(f"获取前台窗口信息时出错: {e}")
-            return {"process_name": "Error", "window_title": "Error"}
+            return {"process_name": "Error", "window_title": "Error", "raw_name": None}
     else:
-        return {"process_name": "None", "window_title": "None"}
+        return {"process_name": "None", "window_title": "None", "raw_name": None}
+
+def queue_focus_changes(settings):
+    """把跟踪器记录的焦点切换交给写入器，使用切换发生的精确时间
 
-def update_database():
-    """更新数据库中的应用使用记录
+    被忽略、隐藏的应用以及暂停监控期间只结束当前区间，不开始新的区间。
+    标题按规则规范化；同一应用内持续时间不到 title_flap_seconds 的标题视为闪烁，
+    不单独记录。最后一个切换还没有满足这个时间时留到下一次采样处理
+    """
+    global _last_focus
+    normalizer = get_title_normalizer()
+    flap_seconds = settings['title_flap_seconds']
+    while focus_changes:
+        current = focus_changes[0]
+        process_name = current['process_name']
+        window_title = current['window_title']
+        if (not settings['monitoring_enabled'] or not current['hwnd'] or process_name is None
+                or process_name in settings['ignored_apps'] or process_name in settings['hidden_from_web']):
+            process_name = window_title = None
+        elif process_name in settings['ignore_title_changes']:
+            window_title = get_name_registry().display_name(process_name)
+        else:
+            window_title = normalizer.normalize(process_name, window_title)
+
+        focus = (process_name, window_title)
+        if focus == _last_focus:
+            focus_changes.popleft()
+            continue
+        if process_name is not None and _last_focus is not None and process_name == _last_focus[0]:
+            if len(focus_changes) > 1:
+                if focus_changes[1]['since'] - current['since'] < flap_seconds:
+                    focus_changes.popleft()
+                    continue
+            elif time.time() - current['since'] < flap_seconds:
+                break
+        focus_changes.popleft()
+        _last_focus = focus
+        batch_writer.focus(process_name, window_title, datetime.datetime.fromtimestamp(current['since']))
+
+def sync_external_changes():
+    """其他连接修改数据库后（控制面板清空数据库、清理任务删除记录等）同步内存状态
+
+    重新读取未结束的会话；被删除的会话同时丢弃去抖状态，当前的前台区间被删除时
+    从现在开始重新记录当前焦点。之后的采样会为仍在运行的窗口开始新的会话
+    """
+    global _last_focus
+    if not batch_writer.changed_externally() and open_sessions.loaded:
+        return
+    previous = open_sessions.sessions
+    with db_pool.connection() as conn:
+        open_sessions.load(conn)
+        focus_open = conn.execute("SELECT 1 FROM focus_intervals WHERE end_time IS NULL LIMIT 1").fetchone()
+    session_debouncer.forget(previous - open_sessions.sessions)
+    if _last_focus is not None and _last_focus[0] is not None and focus_open is None:
+        _last_focus = None
+        current = foreground_tracker.current
+        if current is not None and not focus_changes:
+            current['since'] = time.time()
+            focus_changes.append(current)
+
+def update_database(running_apps, foreground_app):
+    """根据一次采样结果更新数据库中的应用使用记录
     
     主要功能：
     1. 记录新启动的应用
     2. 更新已关闭应用的结束时间
     3. 处理前台应用的特殊情况
-    4. 清理过期数据
+    
+    与内存中的未结束会话表比较，只把新打开和已关闭的会话写入数据库，
+    返回本次批量写入的统计信息（行数和提交耗时）
     """
+    started = time.perf_counter()
     settings = load_config()
+    # 启动时和其他连接修改数据库后才从数据库读取未结束的会话
+    sync_external_changes()
+    queue_focus_changes(settings)
     if not settings['monitoring_enabled']:
-        return
-        
-    create_table()
-
-    # 获取当前运行的应用和前台应用信息
-    running_apps = get_running_applications()
-    foreground_app = get_foreground_window_info()
+        return flush_writes()
 
-    # 检查前台应用是否需要隐藏
-    thread_id, process_id = win32process.GetWindowThreadProcessId(win32gui.GetForegroundWindow())
-    try:
-        foreground_process = psutil.Process(process_id)
-        if foreground_process.name() in settings.get('hidden_from_web', []):
-            foreground_app = {"process_name": "None", "window_title": "None"}
-    except (psutil.NoSuchProcess, psutil.AccessDenied):
-        pass
-
-    # 获取数据库中的运行中应用列表
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT process_name, window_title FROM app_usage WHERE end_time IS NULL")
-    db_running_apps = set([(row['process_name'], row['window_title']) for row in cur.fetchall()])
-    conn.close()
-
-    # 记录新启动的应用
-    now = datetime.datetime.now()
+    # 构建当前快照中的会话集合（使用原始进程名称和规范化后的标题，隐藏的应用不会出现在快照中）
+    normalizer = get_title_normalizer()
+    current_sessions = set()
+    foreground_processes = set()
+    foreground_name = foreground_app.get('raw_name')
     for app in running_apps:
-        # 检查是否使用了自定义名称
-        original_name = None
-        for proc_name, custom_name in settings.get('custom_names', {}).items():
-            if custom_name == app['process_name']:
-                original_name = proc_name
-                break
-        process_name = original_name or app['process_name']
-        
-        # 跳过隐藏的应用
-        if process_name in settings.get('hidden_from_web', []):
-            continue
+        process_name = app['raw_name']
             
         # 设置应用的前台/后台状态
-        is_foreground = 0  # 默认为后台
-        if foreground_app['process_name'] == app['process_name'] and foreground_app['window_title']:
-            is_foreground = 1
+        if process_name == foreground_name and foreground_app['window_title']:
+            foreground_processes.add(process_name)
             
-        # 记录新的窗口
         for title in app['window_titles']:
-             if (app['process_name'], title) not in db_running_apps:
-                insert_data(app['process_name'], title, now, is_foreground)
-
-    # 更新已关闭应用的结束时间
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT process_name, window_title FROM app_usage WHERE end_time IS NULL")
-    db_running_apps = [(row['process_name'], row['window_title']) for row in cur.fetchall()]
-    conn.close()
-
-    for process_name, window_title in db_running_apps:
-        found = False
-        for app in running_apps:
-            for title in app['window_titles']:
-                if app['process_name'] == process_name and title == window_title:
-                    found = True
-                    break
-        if not found:
-            update_end_time(process_name, window_title)
+            current_sessions.add((process_name, normalizer.normalize(process_name, title)))
 
     # 处理没有窗口但在前台的特殊应用
-    if foreground_app['process_name'] != "None" and not any(app['process_name'] == foreground_app['process_name'] for app in running_apps):
-        # 检查是否使用了自定义名称
-        original_name = None
-        for proc_name, custom_name in settings.get('custom_names', {}).items():
-            if custom_name == foreground_app['process_name']:
-                original_name = proc_name
-                break
-        process_name = original_name or foreground_app['process_name']
-        
-        # 如果不是隐藏的应用，记录它
-        if process_name not in settings.get('hidden_from_web', []):
-            conn = get_db_connection()
-            cur = conn.cursor()
-            cur.execute("SELECT process_name, window_title FROM app_usage WHERE process_name = ? and window_title = ?", 
-                       (foreground_app['process_name'], foreground_app['window_title']))
-            app_check = cur.fetchone()
-            conn.close()
-            if not app_check:
-                insert_data(foreground_app['process_name'], foreground_app['window_title'], now, 1)
+    if foreground_name and not any(app['raw_name'] == foreground_name for app in running_apps):
+        current_sessions.add((foreground_name, normalizer.normalize(foreground_name, foreground_app['window_title'])))
+        foreground_processes.add(foreground_name)
+
+    # 去抖：新标题要持续出现 title_min_dwell 秒才开始新会话，刚消失的会话在这段时间内保持打开
+    now = datetime.datetime.now()
+    current_sessions = session_debouncer.update(current_sessions, open_sessions.sessions, now,
+                                                settings['title_min_dwell'])
+
+    # 一次集合差运算得到新打开和已关闭的会话，只把变化写入数据库
+    # 开始/结束时间使用会话首次出现/第一次消失的采样时间
+    opened, closed = open_sessions.diff(current_sessions)
+    for process_name, window_title in opened:
+        is_foreground = 1 if process_name in foreground_processes else 0
+        start_time = session_debouncer.started_at((process_name, window_title), now)
+        batch_writer.insert(process_name, window_title, start_time, is_foreground)
+    for process_name, window_title in closed:
+        end_time = session_debouncer.ended_at((process_name, window_title), now)
+        batch_writer.close(process_name, window_title, end_time)
+
+    tick_seconds.observe(time.perf_counter() - started, 'diff')
+
+    # 所有变化在一个事务中提交，写入成功后再更新内存状态
+    stats = flush_writes()
+    open_sessions.apply(opened, closed)
+    return stats
+
+def flush_writes():
+    """提交批量写入器中的变化并记录写入指标"""
+    with tick_seconds.time('write'):
+        stats = batch_writer.flush()
+    written = 0
+    for kind in ('inserted', 'closed', 'focus'):
+        if stats[kind]:
+            rows_written.inc(kind, amount=stats[kind])
+            written += stats[kind]
+    if written:
+        commit_seconds.observe(stats['commit_ms'] / 1000)
+    return stats
+
+def sample_once():
+    """执行一次采样：获取快照、写入数据库并发布给 HTTP 路由
+
+    只有在观察到变化时才向 /stream 的客户端推送事件
+
+    Returns:
+        bool: 前台窗口或运行中的应用是否有变化
+    """
+    started = time.perf_counter()
+    running_apps = get_running_applications()
+    foreground_app = get_foreground_window_info()
+    tick_seconds.observe(time.perf_counter() - started, 'snapshot')
+    write_stats = update_database(running_apps, foreground_app)
+
+    with _snapshot_lock:
+        previous_apps = latest_snapshot['running_apps']
+        previous_foreground = latest_snapshot['foreground_app']
+        if write_stats is not None:
+            latest_snapshot['last_write'] = write_stats
+        latest_snapshot['running_apps'] = running_apps
+        latest_snapshot['foreground_app'] = foreground_app
+        latest_snapshot['updated_at'] = datetime.datetime.now().isoformat()
+
+    if foreground_app != previous_foreground:
+        broadcaster.publish('foreground', foreground_app)
+    apps_diff = diff_running_apps(previous_apps, running_apps)
+    if apps_diff is not None:
+        broadcaster.publish('running_apps_diff', apps_diff)
+    tick_seconds.observe(time.perf_counter() - started, 'total')
+    return foreground_app != previous_foreground or apps_diff is not None
+
+def get_latest_snapshot():
+    """获取最近一次采样的结果"""
+    with _snapshot_lock:
+        return dict(latest_snapshot)
+
+def next_sample_delay(changed):
+    """根据本次采样是否有变化、用户是否空闲和是否锁屏计算下一次采样前的等待时间"""
+    settings = load_config()
+    sampler_pacing.min_interval = max(settings['sample_interval'], 0.1)
+    sampler_pacing.max_interval = settings['sample_interval_max']
+    sampler_pacing.locked_interval = settings['sample_interval_locked']
+    sampler_pacing.idle_threshold = settings['idle_threshold']
+    try:
+        idle_seconds = platform_backend.idle_seconds()
+        locked = platform_backend.is_locked()
+    except Exception as e:
+        print(f"空闲检测失败: {e}")
+        idle_seconds, locked = 0.0, False
+
+    delay = sampler_pacing.next(changed, idle_seconds, locked)
+    with _snapshot_lock:
+        latest_snapshot['sampler'] = {
+            'interval': delay,
+            'state': sampler_pacing.state,
+            'idle_seconds': round(idle_seconds, 1),
+            'locked': locked
+        }
+    return delay
+
+def run_sampler():
+    """后台采样循环
+
+    数据采集与请求处理解耦：无论有多少客户端连接，每个采样间隔只采集一次。
+    采样间隔自适应：有变化时最快，没有变化或用户空闲时逐步放慢，锁屏时最慢。
+    前台窗口切换时会被立即唤醒，使记录的切换时间不受采样间隔影响
+    """
+    while True:
+        sampler_wakeup.clear()
+        changed = False
+        try:
+            changed = sample_once()
+            if titles_prune_requested.is_set():
+                prune_unused_titles()
+        except Exception as e:
+            tick_errors.inc()
+            print(f"采样失败: {e}")
+        sampler_wakeup.wait(next_sample_delay(changed))
 
 def cleanup_database():
-    """清理数据库，删除旧数据"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    """清理数据库，删除旧数据
+
+    启用归档且安装了 pyarrow 时，过期记录先写入 config.ARCHIVE_DIR 下的 Parquet 文件再删除，
+    过期的前台区间同时删除，不再被引用的窗口标题随后由采样线程删除。删除分批进行，每批一个短事务，结束后增量回收空闲页；进度和耗时见 /api/cleanup
+    """
     cutoff_time = datetime.datetime.now() - datetime.timedelta(seconds=config.DATA_RETENTION_SECONDS)
     cutoff_time_str = cutoff_time.isoformat()
 
-    cursor.execute("DELETE FROM app_usage WHERE start_time < ?", (cutoff_time_str,))
-    conn.commit()
-    conn.close()
-    print("Database cleanup completed.")
+    run = cleanup_progress.start('retention')
+    try:
+        with db_pool.connection() as conn:
+            if config.ARCHIVE_ENABLED and archive.available():
+                count = archive.archive_expired(conn, cutoff_time, run=run)
+                print(f"已归档 {count} 条过期记录")
+            else:
+                if config.ARCHIVE_ENABLED:
+                    print("未安装 pyarrow，过期记录将直接删除而不归档")
+                # 未结束的会话保留，否则内存中的未结束会话表会指向已删除的记录
+                retention.delete_where(conn, 'app_usage', "start_time < ? AND end_time IS NOT NULL",
+                                       (cutoff_time_str,), run)
+            # 前台区间不归档，按结束时间直接删除（usage_hourly / usage_daily 是长期统计，保留）
+            retention.delete_where(conn, 'focus_intervals', "end_time IS NOT NULL AND end_time < ?",
+                                   (cutoff_time_str,), run)
+            retention.incremental_vacuum(conn, run)
+    finally:
+        cleanup_progress.finish(run)
+        record_cleanup(run)
+    request_title_prune()
+    stats = run.to_dict()
+    print(f"Database cleanup completed: 删除 {sum(stats['deleted'].values())} 行，"
+          f"回收 {stats['vacuumed_pages']} 页，耗时 {stats['elapsed_ms']} ms")
 
 def calculate_running_time(start_time_str, end_time_str):
     """计算运行时间"""
@@ -316,34 +604,132 @@ def calculate_running_time(start_time_str, end_time_str):
     running_time = end_time - start_time
     return running_time
 
+def encode_cursor(start_time, row_id):
+    """把 (start_time, id) 编码为分页游标"""
+    return base64.urlsafe_b64encode(f"{start_time}|{row_id}".encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """解析分页游标，格式错误时抛出 ValueError"""
+    try:
+        start_time, row_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').rsplit('|', 1)
+        return start_time, int(row_id)
+    except Exception:
+        raise ValueError(f"无效的分页游标: {cursor}")
+
+def resolve_process_ids(names):
+    """查找进程名称对应的 processes.id，不存在的名称忽略"""
+    names = list(names)
+    with db_pool.connection() as conn:
+        return [row[0] for row in conn.execute(
+            f"SELECT id FROM processes WHERE name IN ({','.join('?' * len(names))})", names)]
+
+def fetch_usage_page(args, closed_only=False):
+    """按 (start_time, id) 键集分页查询使用记录（从新到旧）
+
+    支持的参数：
+    - process: 进程名称或显示名称
+    - title: 窗口标题包含的文字
+    - from / to: start_time 的范围（ISO 格式，包含 from，不包含 to）
+    - page_size: 每页条数，默认 config.HISTORY_PAGE_SIZE，最大 config.MAX_PAGE_SIZE
+    - after: 返回比该游标更旧的一页；before: 返回比该游标更新的一页
+
+    Returns:
+        tuple: (rows, next_cursor, prev_cursor)，没有更多数据时游标为 None
+    """
+    settings = load_config()
+    hidden_apps = list(settings['hidden_from_web'])
+    page_size = min(max(args.get('page_size', config.HISTORY_PAGE_SIZE, type=int), 1), config.MAX_PAGE_SIZE)
+
+    conditions = []
+    params = []
+    if closed_only:
+        conditions.append("end_time IS NOT NULL")
+    if hidden_apps:
+        conditions.append(f"process_name NOT IN ({','.join('?' * len(hidden_apps))})")
+        params.extend(hidden_apps)
+    if args.get('process'):
+        # 同时接受原始进程名称和显示名称；先解析成 process_id，才能沿 (process_id, start_time) 索引分页
+        process_ids = resolve_process_ids({args['process'], get_name_registry().process_name(args['process'])})
+        if not process_ids:
+            return [], None, None
+        conditions.append(f"process_id IN ({','.join('?' * len(process_ids))})")
+        params.extend(process_ids)
+    if args.get('title'):
+        title = args['title'].replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        conditions.append("window_title LIKE ? ESCAPE '\\'")
+        params.append(f"%{title}%")
+    if args.get('from'):
+        conditions.append("start_time >= ?")
+        params.append(datetime.datetime.fromisoformat(args['from']).isoformat())
+    if args.get('to'):
+        conditions.append("start_time < ?")
+        params.append(datetime.datetime.fromisoformat(args['to']).isoformat())
+
+    before = args.get('before')
+    after = args.get('after')
+    if before:
+        conditions.append("(start_time, id) > (?, ?)")
+        params.extend(decode_cursor(before))
+        order = "ASC"
+    else:
+        if after:
+            conditions.append("(start_time, id) < (?, ?)")
+            params.extend(decode_cursor(after))
+        order = "DESC"
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    with db_pool.connection() as conn:
+        rows = conn.execute(f"""
+            SELECT id, process_name, window_title, start_time, end_time
+            FROM usage_view
+            {where}
+            ORDER BY start_time {order}, id {order}
+            LIMIT ?
+        """, params + [page_size + 1]).fetchall()
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if before:
+        rows.reverse()
+
+    next_cursor = prev_cursor = None
+    if rows:
+        first, last = rows[0], rows[-1]
+        # 向后翻页时一定还有更新的记录，向前翻页时一定还有更旧的记录
+        if has_more or before:
+            next_cursor = encode_cursor(last['start_time'], last['id'])
+        if after or (before and has_more):
+            prev_cursor = encode_cursor(first['start_time'], first['id'])
+    return rows, next_cursor, prev_cursor
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def _record_request(response):
+    """按路由模板（而不是实际路径）记录请求耗时，流式响应只计到开始输出为止"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        request_seconds.observe(time.perf_counter() - started, route, request.method)
+        requests_total.inc(route, request.method, str(response.status_code))
+    return response
+
 @app.route('/')
 def index():
-    update_database() # 每次访问首页都更新数据库
-    running_apps = get_running_applications() #然后显示
-    foreground_app = get_foreground_window_info() #这个也一起显示
-    return render_template('index.html', running_apps=running_apps, foreground_app=foreground_app)
+    snapshot = get_latest_snapshot()  # 只读取后台采样的结果
+    return render_template('index.html', running_apps=snapshot['running_apps'], foreground_app=snapshot['foreground_app'])
 
 @app.route('/history')
 def history():
-    """显示历史记录"""
-    settings = load_config()
-    hidden_apps = settings.get('hidden_from_web', [])
-    
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # 修改SQL查询以排除被隐藏的应用
-    placeholders = ','.join('?' * len(hidden_apps)) if hidden_apps else "''"
-    cursor.execute(f"""
-        SELECT process_name, window_title, start_time, end_time
-        FROM app_usage
-        WHERE end_time IS NOT NULL
-        AND process_name NOT IN ({placeholders})
-        ORDER BY start_time DESC
-        LIMIT 100
-    """, hidden_apps if hidden_apps else [])
-    
-    rows = cursor.fetchall()
+    """显示历史记录（键集分页，支持按应用、标题和时间筛选）"""
+    try:
+        rows, next_cursor, prev_cursor = fetch_usage_page(request.args, closed_only=True)
+    except ValueError as e:
+        return str(e), 400
+
+    names = get_name_registry()
     history_data = []
     for row in rows:
         start_time = row['start_time']
@@ -352,42 +738,39 @@ def history():
         if start_time and end_time:
             running_time = calculate_running_time(start_time, end_time)
         history_data.append({
-            'process_name': row['process_name'],
+            'process_name': names.display_name(row['process_name']),
             'window_title': row['window_title'],
             'start_time': start_time,
             'end_time': end_time,
             'running_time': str(running_time) if running_time else "N/A"
         })
-    conn.close()
-    return render_template('history.html', history_data=history_data)
+    # 翻页链接保留当前的筛选条件
+    filters = {key: value for key, value in request.args.items() if key not in ('after', 'before')}
+    return render_template('history.html', history_data=history_data, filters=filters,
+                           next_cursor=next_cursor, prev_cursor=prev_cursor)
 
 @app.route('/foreground')
 def foreground():
-     foreground_app = get_foreground_window_info()
-     return jsonify(foreground_app)
+     return jsonify(get_latest_snapshot()['foreground_app'])
 
 @app.route('/api/data')
 def get_data():
-    settings = load_config()
-    hidden_apps = settings.get('hidden_from_web', [])
-    
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # 修改SQL查询以排除被隐藏的应用
-    cursor.execute("""
-        SELECT process_name, window_title, start_time, end_time 
-        FROM app_usage 
-        WHERE process_name NOT IN ({})
-        ORDER BY start_time DESC
-    """.format(','.join('?' * len(hidden_apps))), hidden_apps)
-    
-    rows = cursor.fetchall()
+    """使用记录 API（键集分页）
+
+    参数与 /history 相同。为了兼容旧的调用方，响应仍然是记录列表，
+    翻页游标放在 Link 响应头中（rel="next" / rel="prev"）
+    """
+    try:
+        rows, next_cursor, prev_cursor = fetch_usage_page(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    names = get_name_registry()
     data = []
     
     for row in rows:
-        process_name, window_title, start_time, end_time = row
-        display_name = settings.get('custom_names', {}).get(process_name, process_name)
+        row_id, process_name, window_title, start_time, end_time = row
+        display_name = names.display_name(process_name)
         
         data.append({
             'name': display_name,
@@ -396,22 +779,198 @@ def get_data():
             'end_time': end_time
         })
     
-    conn.close()
-    return jsonify(data)
+    response = jsonify(data)
+    filters = {key: value for key, value in request.args.items() if key not in ('after', 'before')}
+    links = []
+    if next_cursor:
+        links.append(f'<{url_for("get_data", **filters, after=next_cursor)}>; rel="next"')
+    if prev_cursor:
+        links.append(f'<{url_for("get_data", **filters, before=prev_cursor)}>; rel="prev"')
+    if links:
+        response.headers['Link'] = ', '.join(links)
+    return response
+
+@app.route('/api/export')
+def export_data():
+    """流式导出使用记录
+
+    参数：
+    - format: ndjson 或 csv，默认 ndjson
+    - from / to: start_time 的范围（ISO 格式，包含 from，不包含 to），默认导出全部
+
+    记录从数据库游标逐批读取并立即发送，导出几个月的数据也不会占用大量内存
+    """
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in export.FORMATS:
+        return jsonify({'error': 'format 只能是 ndjson 或 csv'}), 400
+    try:
+        start = datetime.datetime.fromisoformat(request.args['from']).isoformat() if request.args.get('from') else None
+        end = datetime.datetime.fromisoformat(request.args['to']).isoformat() if request.args.get('to') else None
+    except ValueError:
+        return jsonify({'error': 'from / to 必须是 ISO 格式的时间'}), 400
+
+    settings = load_config()
+    names = get_name_registry()
+
+    def generate():
+        # 导出可能持续很久，使用单独的连接，不占用连接池
+        conn = database.connect()
+        try:
+            batches = export.iter_usage_rows(conn, start, end, config.EXPORT_BATCH_SIZE)
+            yield from export.export_chunks(batches, fmt, settings['hidden_from_web'], names.display_name)
+        finally:
+            conn.close()
+
+    filename = f"app_usage.{fmt}"
+    return Response(generate(), mimetype=export.FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@app.route('/stream')
+def stream():
+    """Server-Sent Events：连接时发送完整状态，之后只推送变化"""
+    def generate():
+        q = broadcaster.subscribe()
+        try:
+            snapshot = get_latest_snapshot()
+            yield format_sse('foreground', snapshot['foreground_app'])
+            yield format_sse('running_apps', snapshot['running_apps'])
+            while True:
+                try:
+                    event, data = q.get(timeout=15)
+                except queue.Empty:
+                    yield ": keepalive\n\n"  # 注释行，防止空闲连接被代理断开
+                    continue
+                if event == RESYNC:
+                    snapshot = get_latest_snapshot()
+                    yield format_sse('foreground', snapshot['foreground_app'])
+                    yield format_sse('running_apps', snapshot['running_apps'])
+                else:
+                    yield format_sse(event, data)
+        finally:
+            broadcaster.unsubscribe(q)
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/focus')
+def get_focus():
+    """统计每个应用的前台时间
+
+    参数 from / to 为 ISO 格式的时间，默认统计今天
+    """
+    now = datetime.datetime.now()
+    try:
+        start = datetime.datetime.fromisoformat(request.args.get('from', now.strftime('%Y-%m-%d')))
+        end = datetime.datetime.fromisoformat(request.args['to']) if 'to' in request.args else now
+    except ValueError:
+        return jsonify({'error': 'from / to 必须是 ISO 格式的时间'}), 400
+
+    settings = load_config()
+    names = get_name_registry()
+    with db_pool.connection() as conn:
+        rows = reports.focused_seconds_by_app(conn, start, end, now)
+
+    return jsonify([
+        {'name': names.display_name(process_name), 'focused_seconds': round(seconds, 1)}
+        for process_name, seconds in rows
+        if process_name not in settings['hidden_from_web']
+    ])
+
+@app.route('/api/summary')
+def get_summary():
+    """按小时或按天汇总各应用的打开时间和前台时间（只读取聚合表）
+
+    参数：
+    - from / to: ISO 格式的日期或时间，包含两端所在的小时/天，默认统计今天
+    - granularity: hour 或 day，默认 day
+    """
+    now = datetime.datetime.now()
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in ('hour', 'day'):
+        return jsonify({'error': 'granularity 只能是 hour 或 day'}), 400
+    try:
+        start = datetime.datetime.fromisoformat(request.args.get('from', now.strftime('%Y-%m-%d')))
+        end = datetime.datetime.fromisoformat(request.args['to']) if 'to' in request.args else now
+    except ValueError:
+        return jsonify({'error': 'from / to 必须是 ISO 格式的时间'}), 400
+
+    settings = load_config()
+    names = get_name_registry()
+    with db_pool.connection() as conn:
+        rows = rollups.query_summary(conn, start, end, granularity)
+
+    return jsonify([
+        {
+            'period': period,
+            'name': names.display_name(process_name),
+            'open_seconds': round(open_seconds, 1),
+            'focused_seconds': round(focused_seconds, 1)
+        }
+        for period, process_name, open_seconds, focused_seconds in rows
+        if process_name not in settings['hidden_from_web']
+    ])
+
+@app.route('/api/cleanup')
+def get_cleanup_progress():
+    """数据清理任务的进度和耗时（正在运行的任务和最近完成的任务）"""
+    return jsonify(cleanup_progress.snapshot())
+
+@app.route('/api/status')
+def get_status():
+    """采样线程的状态：平台后端、最近一次采样时间、采样间隔、写入统计和进程信息缓存的命中情况"""
+    snapshot = get_latest_snapshot()
+    return jsonify({
+        'platform': platform_backend.name,
+        'collecting': platform_backend.can_collect,
+        'updated_at': snapshot['updated_at'],
+        'sampler': snapshot['sampler'],
+        'last_write': snapshot['last_write'],
+        'write_totals': batch_writer.totals,
+        'process_cache': process_cache.stats()
+    })
+
+@app.route('/api/profile', methods=['GET', 'POST'])
+def collector_profile():
+    """采样线程的性能分析
+
+    GET 返回最近一次分析的状态和耗时最多的函数；
+    POST 开始一次分析（参数 seconds，默认 config.PROFILE_DEFAULT_SECONDS），只接受本机的请求
+    """
+    if request.method == 'POST':
+        if request.remote_addr not in ('127.0.0.1', '::1'):
+            return jsonify({'error': '只能从本机开始性能分析'}), 403
+        seconds = request.args.get('seconds', config.PROFILE_DEFAULT_SECONDS)
+        try:
+            return jsonify(start_collector_profile(seconds).to_dict()), 202
+        except RuntimeError as e:
+            return jsonify({'error': str(e)}), 409
+    current = collector_profiler
+    return jsonify(current.to_dict() if current is not None else None)
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus 文本格式的性能指标"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
 
 @app.route('/api/running_apps')
 def get_running_apps():
     """获取运行中的应用列表的API"""
-    update_database()  # 更新数据库
-    running_apps = get_running_applications()
-    return jsonify(running_apps)
+    return jsonify(get_latest_snapshot()['running_apps'])
 
 if __name__ == '__main__':
     # 创建数据库表
     create_table()
 
+    # 启动前台窗口跟踪和后台采样线程
+    if platform_backend.can_collect:
+        foreground_tracker.start()
+        sampler_thread = threading.Thread(target=run_sampler, name=SAMPLER_THREAD_NAME)
+        sampler_thread.daemon = True
+        sampler_thread.start()
+    else:
+        print("当前平台后端不采集数据，只提供历史记录和统计接口")
+
     # 定时清理数据库 (例如每小时一次)
-    import threading
     def run_cleanup():
         while True:
             cleanup_database()
@@ -421,5 +980,14 @@ if __name__ == '__main__':
     cleanup_thread.daemon = True  # 设置为守护线程，主线程退出时自动退出
     cleanup_thread.start()
 
-    # 启动Flask应用，监听所有网络接口
-    app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
+    # 启动Web服务，监听所有网络接口
+    server_mode = config.SERVER_MODE
+    if server_mode == 'asgi':
+        import asgi
+        if not asgi.available():
+            print("未安装 uvicorn，改用 Flask 自带的服务器")
+            server_mode = 'wsgi'
+    if server_mode == 'asgi':
+        asgi.serve(asgi.create_app(app, broadcaster, get_latest_snapshot), host='0.0.0.0', port=5000)
+    else:
+        app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
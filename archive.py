@@ -0,0 +1,155 @@
+"""过期使用记录的列式归档
+
+cleanup_database() 删除过期记录之前，先把它们按日期写入 Parquet 文件：
+
+    archive/day=2024-01-01/part-<最小记录 ID>.parquet
+
+每天的记录按 ID 顺序分成每块 config.CLEANUP_BATCH_SIZE 行，每块写一个文件，
+文件改名完成后在一个事务中删除这一块。中断后重新运行时，先把分区中已有文件里的
+记录从数据库中删除（上次写入了文件但没来得及删除），不会重复归档。
+
+进程名称和窗口标题使用字典编码，重复的字符串在文件中只存一份。
+query() 通过 pyarrow.dataset 扫描归档：日期条件只会打开对应的分区目录，
+进程条件借助 Parquet 行组的统计信息跳过不相关的数据。
+
+pyarrow 是可选依赖，没有安装时 available() 返回 False，清理时退回到直接删除。
+"""
+import datetime
+import os
+
+import config
+import retention
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = ds = pq = None
+
+DICTIONARY_COLUMNS = ['process_name', 'window_title']
+
+
+def available():
+    """是否可以使用归档（已安装 pyarrow）"""
+    return pa is not None
+
+
+def _to_table(rows):
+    """把 (id, process_name, window_title, start_time, end_time, is_foreground) 行转换为 Arrow 表"""
+    ids, process_names, window_titles, start_times, end_times, foreground = zip(*rows)
+    return pa.table({
+        'id': pa.array(ids, pa.int64()),
+        'process_name': pa.array(process_names, pa.string()).dictionary_encode(),
+        'window_title': pa.array(window_titles, pa.string()).dictionary_encode(),
+        'start_time': pa.array([datetime.datetime.fromisoformat(v) for v in start_times], pa.timestamp('us')),
+        'end_time': pa.array([datetime.datetime.fromisoformat(v) for v in end_times], pa.timestamp('us')),
+        'is_foreground': pa.array(foreground, pa.int8()),
+    })
+
+
+def _archived_ids(directory):
+    """分区目录中已归档的记录 ID"""
+    ids = set()
+    if not os.path.isdir(directory):
+        return ids
+    for name in os.listdir(directory):
+        if name.startswith('part-') and name.endswith('.parquet'):
+            table = pq.read_table(os.path.join(directory, name), columns=['id'])
+            ids.update(table.column('id').to_pylist())
+    return ids
+
+
+def _write_chunk(directory, rows):
+    """写入一块归档文件，文件名取这块记录的最小 ID
+
+    先写入以 . 开头的临时文件再改名，扫描时不会读到写了一半的文件
+    """
+    os.makedirs(directory, exist_ok=True)
+    filename = f"part-{min(row[0] for row in rows)}.parquet"
+    temp_path = os.path.join(directory, f".{filename}.tmp")
+    pq.write_table(_to_table(rows), temp_path, use_dictionary=DICTIONARY_COLUMNS)
+    os.replace(temp_path, os.path.join(directory, filename))
+
+
+def archive_expired(conn, cutoff, archive_dir=None, run=None):
+    """把 start_time 早于 cutoff 的已结束记录写入归档，然后从 app_usage 中删除
+
+    按天处理，内存中最多只有一天的过期记录。未结束的会话保留在数据库中，
+    结束后的下一次清理再归档。每块记录写入文件后在一个短事务中删除，
+    run 为记录进度的 retention.CleanupRun（可选）
+
+    Returns:
+        int: 归档的记录数
+    """
+    archive_dir = archive_dir or config.ARCHIVE_DIR
+    cutoff_str = cutoff.isoformat()
+    days = [row[0] for row in conn.execute("""
+        SELECT DISTINCT substr(start_time, 1, 10) FROM app_usage
+        WHERE start_time < ? AND end_time IS NOT NULL
+        ORDER BY 1
+    """, (cutoff_str,))]
+
+    batch_size = max(int(config.CLEANUP_BATCH_SIZE), 1)
+    total = 0
+    for day in days:
+        next_day = (datetime.date.fromisoformat(day) + datetime.timedelta(days=1)).isoformat()
+        rows = conn.execute("""
+            SELECT id, process_name, window_title, start_time, end_time, is_foreground
+            FROM usage_view
+            WHERE start_time >= ? AND start_time < ? AND end_time IS NOT NULL
+            ORDER BY id
+        """, (day, min(next_day, cutoff_str))).fetchall()
+        if not rows:
+            continue
+
+        directory = os.path.join(archive_dir, f"day={day}")
+        archived = _archived_ids(directory)
+        if archived:
+            # 上次运行写入了文件但没有删除的记录，只需要删除
+            leftover = [(row[0],) for row in rows if row[0] in archived]
+            retention.delete_keys(conn, 'app_usage', leftover, run)
+            rows = [row for row in rows if row[0] not in archived]
+
+        for offset in range(0, len(rows), batch_size):
+            chunk = rows[offset:offset + batch_size]
+            _write_chunk(directory, chunk)
+            retention.delete_keys(conn, 'app_usage', [(row[0],) for row in chunk], run)
+            total += len(chunk)
+    return total
+
+
+def query(start=None, end=None, process_names=None, columns=None, archive_dir=None):
+    """扫描归档中的使用记录
+
+    Args:
+        start, end: start_time 的范围（datetime，包含 start，不包含 end），None 表示不限制
+        process_names: 只返回这些进程的记录（原始进程名称）
+        columns: 要读取的列，默认读取全部列（包括分区列 day）
+        archive_dir: 归档目录，默认 config.ARCHIVE_DIR
+
+    Returns:
+        pyarrow.Table，归档目录不存在时返回 None
+    """
+    if not available():
+        raise RuntimeError("查询归档需要安装 pyarrow")
+    archive_dir = archive_dir or config.ARCHIVE_DIR
+    if not os.path.isdir(archive_dir):
+        return None
+
+    dataset = ds.dataset(archive_dir, format='parquet',
+                         partitioning=ds.partitioning(pa.schema([('day', pa.string())]), flavor='hive'))
+    conditions = []
+    if start is not None:
+        conditions.append(ds.field('day') >= start.date().isoformat())
+        conditions.append(ds.field('start_time') >= pa.scalar(start, pa.timestamp('us')))
+    if end is not None:
+        conditions.append(ds.field('day') <= end.date().isoformat())
+        conditions.append(ds.field('start_time') < pa.scalar(end, pa.timestamp('us')))
+    if process_names:
+        conditions.append(ds.field('process_name').isin(list(process_names)))
+
+    condition = None
+    for expression in conditions:
+        condition = expression if condition is None else condition & expression
+    return dataset.to_table(columns=columns, filter=condition)
@@ -0,0 +1,257 @@
+"""ASGI 服务模式
+
+把 Flask 应用包装成 ASGI 应用，由 uvicorn 在事件循环中处理请求（config.SERVER_MODE = 'asgi'）：
+
+- 只读取内存中采样结果的路由（/、/foreground、/api/running_apps、/api/status、/metrics 等）
+  直接在事件循环中执行，不占用线程
+- 读取数据库的只读路由（/history、/api/data、/api/focus、/api/summary）在有界线程池中执行，
+  排队的请求过多时立即返回 503，而不是让所有客户端一起变慢
+- /stream 在事件循环中推送事件，每个连接不再占用一个线程
+- 其余路由（导出、性能分析等）在另一个线程池中执行，长时间的导出不会占用只读查询的线程
+
+数据采集始终在后台采样线程中进行，不在任何请求中执行。需要安装 uvicorn（可选依赖），
+未安装时 app.py 退回到 Flask 自带的服务器。
+"""
+import asyncio
+import concurrent.futures
+import io
+import sys
+
+from werkzeug.exceptions import HTTPException
+
+import config
+from events import format_sse, RESYNC
+
+try:
+    import uvicorn
+except ImportError:  # 可选依赖
+    uvicorn = None
+
+# 直接在事件循环中执行的端点：只读取内存中的数据，不会阻塞
+INLINE_ENDPOINTS = {'index', 'foreground', 'get_running_apps', 'get_status', 'get_cleanup_progress', 'get_metrics'}
+# 读取数据库的只读端点，在有界线程池中执行
+READ_ENDPOINTS = {'history', 'get_data', 'get_focus', 'get_summary'}
+# 在事件循环中推送的 Server-Sent Events 端点
+STREAM_ENDPOINT = 'stream'
+# 没有事件时发送注释行的间隔（秒），防止空闲连接被代理断开
+KEEPALIVE_SECONDS = 15
+
+
+def available():
+    """是否安装了 uvicorn"""
+    return uvicorn is not None
+
+
+def build_environ(scope, body):
+    """根据 ASGI 的 HTTP scope 构造 WSGI environ"""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    client = scope.get('client')
+    if client:
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = client[0], str(client[1])
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[name] = value
+            continue
+        key = 'HTTP_' + name
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _call_wsgi(wsgi_app, environ):
+    """执行 WSGI 应用，返回 (状态码, 响应头, 响应体迭代器)"""
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+    body = wsgi_app(environ, start_response)
+    return started['status'], started['headers'], body
+
+
+def _close(body):
+    close = getattr(body, 'close', None)
+    if close is not None:
+        close()
+
+
+class AsgiApp:
+    """按路由分流的 ASGI 应用
+
+    Args:
+        flask_app: Flask 应用
+        broadcaster: /stream 使用的 events.EventBroadcaster
+        get_snapshot: 返回最近一次采样结果的函数
+        read_threads: 只读查询线程池的大小
+        max_queued_reads: 最多排队的只读查询数，超过时返回 503
+        other_threads: 其余路由线程池的大小
+    """
+
+    def __init__(self, flask_app, broadcaster, get_snapshot, read_threads, max_queued_reads, other_threads):
+        self.flask_app = flask_app
+        self.broadcaster = broadcaster
+        self.get_snapshot = get_snapshot
+        self.max_queued_reads = max_queued_reads
+        self._read_pool = concurrent.futures.ThreadPoolExecutor(read_threads, thread_name_prefix='asgi-read')
+        self._other_pool = concurrent.futures.ThreadPoolExecutor(other_threads, thread_name_prefix='asgi-other')
+        self._queued_reads = 0  # 只在事件循环中读写
+
+    def endpoint(self, scope):
+        """匹配请求对应的 Flask 端点，无法匹配时返回 None（交给 Flask 生成错误响应）"""
+        adapter = self.flask_app.url_map.bind('localhost')
+        try:
+            endpoint, _ = adapter.match(scope['path'], method=scope['method'])
+        except HTTPException:
+            return None
+        return endpoint
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def shutdown(self):
+        self._read_pool.shutdown(wait=False, cancel_futures=True)
+        self._other_pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _http(self, scope, receive, send):
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+
+        endpoint = self.endpoint(scope)
+        if endpoint == STREAM_ENDPOINT and scope['method'] == 'GET':
+            await self._stream(receive, send)
+            return
+
+        environ = build_environ(scope, body)
+        if endpoint in INLINE_ENDPOINTS:
+            status, headers, response_body = _call_wsgi(self.flask_app, environ)
+            try:
+                await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+                await send({'type': 'http.response.body', 'body': b''.join(response_body)})
+            finally:
+                _close(response_body)
+        elif endpoint in READ_ENDPOINTS:
+            if self._queued_reads >= self.max_queued_reads:
+                await self._send_busy(send)
+                return
+            self._queued_reads += 1
+            try:
+                await self._run_in_pool(self._read_pool, environ, send)
+            finally:
+                self._queued_reads -= 1
+        else:
+            await self._run_in_pool(self._other_pool, environ, send)
+
+    async def _run_in_pool(self, pool, environ, send):
+        """在线程池中执行 WSGI 应用，响应体逐块发回事件循环（支持流式导出）"""
+        loop = asyncio.get_running_loop()
+
+        def send_sync(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def run():
+            status, headers, response_body = _call_wsgi(self.flask_app, environ)
+            try:
+                send_sync({'type': 'http.response.start', 'status': status, 'headers': headers})
+                for chunk in response_body:
+                    if chunk:
+                        send_sync({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                send_sync({'type': 'http.response.body', 'body': b''})
+            finally:
+                _close(response_body)
+
+        await loop.run_in_executor(pool, run)
+
+    async def _send_busy(self, send):
+        await send({'type': 'http.response.start', 'status': 503, 'headers': [
+            (b'content-type', b'application/json'), (b'retry-after', b'1')
+        ]})
+        await send({'type': 'http.response.body', 'body': b'{"error": "server busy"}'})
+
+    async def _stream(self, receive, send):
+        """Server-Sent Events：与 app.stream 相同的事件，在事件循环中等待订阅队列"""
+        disconnected = asyncio.ensure_future(receive())  # 客户端断开时收到 http.disconnect
+        subscriber = self.broadcaster.subscribe_async()
+        next_event = None
+        try:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ]})
+
+            async def send_text(text):
+                await send({'type': 'http.response.body', 'body': text.encode('utf-8'), 'more_body': True})
+
+            async def send_snapshot():
+                snapshot = self.get_snapshot()
+                await send_text(format_sse('foreground', snapshot['foreground_app'])
+                                + format_sse('running_apps', snapshot['running_apps']))
+
+            await send_snapshot()
+            while True:
+                if next_event is None:
+                    next_event = asyncio.ensure_future(subscriber.get())
+                done, _ = await asyncio.wait([next_event, disconnected], timeout=KEEPALIVE_SECONDS,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if disconnected in done:
+                    break
+                if next_event not in done:
+                    await send_text(": keepalive\n\n")  # 注释行，防止空闲连接被代理断开
+                    continue
+                event, data = next_event.result()
+                next_event = None
+                if event == RESYNC:
+                    await send_snapshot()
+                else:
+                    await send_text(format_sse(event, data))
+        finally:
+            self.broadcaster.unsubscribe(subscriber)
+            if next_event is not None:
+                next_event.cancel()
+            disconnected.cancel()
+
+
+def create_app(flask_app, broadcaster, get_snapshot):
+    """按 config 中的线程池设置创建 ASGI 应用"""
+    return AsgiApp(flask_app, broadcaster, get_snapshot, config.ASGI_READ_THREADS,
+                   config.ASGI_MAX_QUEUED_READS, config.ASGI_OTHER_THREADS)
+
+
+def serve(asgi_app, host, port):
+    """用 uvicorn 运行 ASGI 应用（阻塞）"""
+    uvicorn.run(asgi_app, host=host, port=port, log_level='warning')
@@ -0,0 +1,358 @@
+"""性能基准测试
+
+用合成的进程/窗口数据驱动采集路径（get_running_applications、update_database），
+用预置的数据库驱动查询路径（/history、/api/data、/api/summary、/api/export），
+不需要 Windows，也不会读写当前目录下的数据库和设置文件：
+
+    python benchmark.py                              # 全部场景，预置数据库 1 万行
+    python benchmark.py --rows 10000,1000000         # 指定预置数据库的行数（可以多个）
+    python benchmark.py --scenario collect --output result.json
+    python benchmark.py --compare old.json new.json  # 比较两次的结果
+
+每个场景在单独的子进程中运行，报告延迟百分位数、每秒处理的行数和峰值内存（RSS），
+结果以 JSON 格式输出。预置的数据库保存在 --data-dir 目录中，相同行数的数据库只生成一次。
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+# (场景, 参数)；查询场景的 rows 由 --rows 决定
+COLLECT_SCENARIOS = [
+    ('snapshot', {'processes': 50, 'windows': 4, 'churn': 0.1, 'iterations': 200}),
+    ('snapshot', {'processes': 500, 'windows': 4, 'churn': 0.1, 'iterations': 50}),
+    ('collect', {'processes': 50, 'windows': 4, 'churn': 0.1, 'iterations': 200}),
+    ('collect', {'processes': 50, 'windows': 4, 'churn': 0.5, 'iterations': 200}),
+]
+QUERY_SCENARIOS = [
+    ('history', {'page_size': 100, 'iterations': 50}),
+    ('api_data', {'page_size': 1000, 'iterations': 20}),
+    ('summary', {'iterations': 50}),
+    ('export', {'iterations': 1}),
+]
+
+SEED_PROCESSES = 50
+SEED_TITLES = 10000
+SEED_START = datetime.datetime(2024, 1, 1)
+SEED_SPAN = datetime.timedelta(days=90)
+
+
+def peak_rss_mb():
+    """当前进程的峰值内存（MiB）"""
+    try:
+        import resource
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 1024 / 1024  # Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def percentiles(latencies):
+    """延迟（毫秒）的统计值"""
+    values = sorted(latencies)
+
+    def pick(q):
+        return round(values[min(len(values) - 1, int(round(q * (len(values) - 1))))], 3)
+
+    return {
+        'p50': pick(0.5),
+        'p90': pick(0.9),
+        'p99': pick(0.99),
+        'max': round(values[-1], 3),
+        'mean': round(sum(values) / len(values), 3),
+    }
+
+
+def seed_database(path, rows, seed=0):
+    """生成包含 rows 条已结束记录的数据库（已存在时直接使用）"""
+    if os.path.exists(path):
+        return
+    import database
+    import migrations
+    import retention
+    import rollups
+
+    print(f"正在生成 {rows} 行的预置数据库: {path}", file=sys.stderr)
+    rng = random.Random(seed)
+    temp_path = path + '.tmp'
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    conn = database.connect(temp_path)
+    retention.enable_incremental_vacuum(conn)
+    migrations.migrate(conn)
+    conn.executemany("INSERT INTO processes (id, name) VALUES (?, ?)",
+                     [(i + 1, f"app{i}.exe") for i in range(SEED_PROCESSES)])
+    conn.executemany("INSERT INTO titles (id, title) VALUES (?, ?)",
+                     [(i + 1, f"Document {i} - Editor") for i in range(SEED_TITLES)])
+
+    step = SEED_SPAN / max(rows, 1)
+    chunk = []
+    for i in range(rows):
+        start = SEED_START + step * i
+        end = start + datetime.timedelta(seconds=rng.randint(5, 600))
+        chunk.append((rng.randint(1, SEED_PROCESSES), rng.randint(1, SEED_TITLES),
+                      start.isoformat(), end.isoformat(), rng.randint(0, 1)))
+        if len(chunk) == 100000 or i == rows - 1:
+            conn.executemany("""
+                INSERT INTO app_usage (process_id, title_id, start_time, end_time, is_foreground)
+                VALUES (?, ?, ?, ?, ?)
+            """, chunk)
+            conn.commit()
+            chunk = []
+    rollups.rebuild(conn)
+    conn.commit()
+    conn.close()
+    os.replace(temp_path, path)
+
+
+def load_app(workdir, db_path, processes=20, windows=3):
+    """在 workdir 中加载 app 模块：合成数据的平台后端、不跟踪前台窗口、关闭标题去抖"""
+    os.chdir(workdir)
+    with open('settings.json', 'w', encoding='utf-8') as f:
+        json.dump({'title_min_dwell': 0}, f)
+
+    import config
+    import database
+    config.PLATFORM = 'fake'
+    config.SYNTHETIC_PROCESSES = processes
+    config.SYNTHETIC_WINDOWS_PER_PROCESS = windows
+    config.FOREGROUND_TRACKING = 'none'
+    config.ARCHIVE_ENABLED = False
+    database.DATABASE = db_path
+
+    import app
+    app.create_table()
+    return app
+
+
+def timed(func, iterations):
+    """执行 func() iterations 次，返回 (延迟列表, 处理的行数)"""
+    latencies = []
+    rows = 0
+    for _ in range(iterations):
+        started = time.perf_counter()
+        rows += func() or 0
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies, rows
+
+
+def bench_snapshot(params, workdir, data_dir):
+    """采集快照：枚举窗口、解析进程信息、应用设置"""
+    app = load_app(workdir, os.path.join(workdir, 'bench.db'), params['processes'], params['windows'])
+    source = app.snapshot_engine.source
+    rng = random.Random(0)
+
+    def run():
+        source.churn(params['churn'], rng)
+        return sum(len(process['window_titles']) for process in app.get_running_applications())
+
+    return timed(run, params['iterations'])
+
+
+def bench_collect(params, workdir, data_dir):
+    """完整的一次采样：快照 + 写入变化的会话（行数为新打开和已关闭的会话数）"""
+    app = load_app(workdir, os.path.join(workdir, 'bench.db'), params['processes'], params['windows'])
+    source = app.snapshot_engine.source
+    rng = random.Random(0)
+    app.sample_once()  # 第一次采样会打开所有会话，不计入结果
+
+    def run():
+        source.churn(params['churn'], rng)
+        app.sample_once()
+        stats = app.get_latest_snapshot()['last_write']
+        return stats['inserted'] + stats['closed'] if stats else 0
+
+    return timed(run, params['iterations'])
+
+
+def _query_app(params, workdir, data_dir):
+    db_path = os.path.join(data_dir, f"seed-{params['rows']}.db")
+    seed_database(db_path, params['rows'])
+    return load_app(workdir, db_path).app.test_client()
+
+
+def bench_history(params, workdir, data_dir):
+    """/history 逐页向后翻页"""
+    client = _query_app(params, workdir, data_dir)
+    state = {'url': f"/history?page_size={params['page_size']}"}
+
+    def run():
+        response = client.get(state['url'])
+        html = response.get_data(as_text=True)
+        match = re.search(r'[?;]after=([^&"]+)', html)
+        base = f"/history?page_size={params['page_size']}"
+        state['url'] = f"{base}&after={match.group(1)}" if match else base
+        return html.count('class="list-group-item')
+
+    return timed(run, params['iterations'])
+
+
+def bench_api_data(params, workdir, data_dir):
+    """/api/data 按 Link 响应头逐页向后翻页"""
+    client = _query_app(params, workdir, data_dir)
+    first = f"/api/data?page_size={params['page_size']}"
+    state = {'url': first}
+
+    def run():
+        response = client.get(state['url'])
+        match = re.search(r'<([^>]+)>; rel="next"', response.headers.get('Link', ''))
+        state['url'] = match.group(1) if match else first
+        return len(response.get_json())
+
+    return timed(run, params['iterations'])
+
+
+def bench_summary(params, workdir, data_dir):
+    """/api/summary 按天汇总整个数据范围（只读取聚合表）"""
+    client = _query_app(params, workdir, data_dir)
+    end = SEED_START + SEED_SPAN
+    url = f"/api/summary?from={SEED_START.date().isoformat()}&to={end.date().isoformat()}&granularity=day"
+
+    def run():
+        return len(client.get(url).get_json())
+
+    return timed(run, params['iterations'])
+
+
+def bench_export(params, workdir, data_dir):
+    """/api/export 流式导出整个数据库"""
+    client = _query_app(params, workdir, data_dir)
+
+    def run():
+        response = client.get('/api/export?format=ndjson', buffered=False)
+        rows = 0
+        for chunk in response.response:
+            rows += chunk.count(b'\n') if isinstance(chunk, bytes) else chunk.count('\n')
+        response.close()
+        return rows
+
+    return timed(run, params['iterations'])
+
+
+BENCHMARKS = {
+    'snapshot': bench_snapshot,
+    'collect': bench_collect,
+    'history': bench_history,
+    'api_data': bench_api_data,
+    'summary': bench_summary,
+    'export': bench_export,
+}
+
+
+def run_child(name, params, data_dir):
+    """在当前（子）进程中运行一个场景，返回结果字典"""
+    with tempfile.TemporaryDirectory(prefix='app_usage_bench_') as workdir:
+        # 数据库和设置文件使用 workdir 中的相对路径，必须先切换目录再导入 app
+        data_dir = os.path.abspath(data_dir)
+        started = time.perf_counter()
+        latencies, rows = BENCHMARKS[name](params, workdir, data_dir)
+        elapsed = time.perf_counter() - started
+        measured = sum(latencies) / 1000
+        # 关闭数据库连接并离开 workdir，Windows 下才能删除临时目录
+        app = sys.modules['app']
+        app.db_pool.close_all()
+        app.batch_writer.reset()
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    return {
+        'name': name,
+        'params': params,
+        'iterations': len(latencies),
+        'latency_ms': percentiles(latencies),
+        'rows': rows,
+        'rows_per_sec': round(rows / measured, 1) if measured else None,
+        'elapsed_s': round(elapsed, 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def run_all(scenarios, data_dir):
+    """每个场景启动一个子进程运行，返回完整的结果"""
+    results = []
+    for name, params in scenarios:
+        print(f"运行 {name} {json.dumps(params)}", file=sys.stderr)
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', json.dumps([name, params]),
+             '--data-dir', data_dir],
+            stdout=subprocess.PIPE, check=True
+        )
+        results.append(json.loads(completed.stdout.decode('utf-8').strip().splitlines()[-1]))
+    return {
+        'created_at': datetime.datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+
+def compare(old_path, new_path):
+    """比较两次结果中相同场景的 p50 / p99 延迟、吞吐量和峰值内存"""
+    with open(old_path, encoding='utf-8') as f:
+        old = {(r['name'], json.dumps(r['params'], sort_keys=True)): r for r in json.load(f)['results']}
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)['results']
+
+    def change(before, after):
+        if not before or after is None:
+            return 'n/a'
+        return f"{(after - before) / before * 100:+.1f}%"
+
+    for result in new:
+        key = (result['name'], json.dumps(result['params'], sort_keys=True))
+        base = old.get(key)
+        if base is None:
+            print(f"{result['name']} {key[1]}: 没有可比较的结果")
+            continue
+        print(f"{result['name']} {key[1]}")
+        print(f"  p50 {base['latency_ms']['p50']} -> {result['latency_ms']['p50']} ms "
+              f"({change(base['latency_ms']['p50'], result['latency_ms']['p50'])})")
+        print(f"  p99 {base['latency_ms']['p99']} -> {result['latency_ms']['p99']} ms "
+              f"({change(base['latency_ms']['p99'], result['latency_ms']['p99'])})")
+        print(f"  rows/s {base['rows_per_sec']} -> {result['rows_per_sec']} "
+              f"({change(base['rows_per_sec'], result['rows_per_sec'])})")
+        print(f"  peak RSS {base['peak_rss_mb']} -> {result['peak_rss_mb']} MiB "
+              f"({change(base['peak_rss_mb'], result['peak_rss_mb'])})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="应用使用监控的性能基准测试")
+    parser.add_argument('--rows', default='10000', help="预置数据库的行数，多个用逗号分隔，例如 10000,1000000,10000000")
+    parser.add_argument('--scenario', action='append', choices=sorted(BENCHMARKS), help="只运行指定的场景（可以多次指定）")
+    parser.add_argument('--data-dir', default='bench_data', help="预置数据库的保存目录")
+    parser.add_argument('--output', help="把 JSON 结果写入文件（默认输出到标准输出）")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="比较两个 JSON 结果文件")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.child:
+        name, params = json.loads(args.child)
+        print(json.dumps(run_child(name, params, args.data_dir), ensure_ascii=False))
+        return
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    scenarios = list(COLLECT_SCENARIOS)
+    for rows in (int(value) for value in args.rows.split(',')):
+        scenarios.extend((name, dict(params, rows=rows)) for name, params in QUERY_SCENARIOS)
+    if args.scenario:
+        scenarios = [(name, params) for name, params in scenarios if name in args.scenario]
+
+    report = json.dumps(run_all(scenarios, args.data_dir), ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report)
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -22,6 +22,30 @@ def create_release():
         'app.py',
         'control_panel.py',
         'config.py',
+        'snapshot.py',
+        'sessions.py',
+        'writer.py',
+        'database.py',
+        'migrations.py',
+        'interning.py',
+        'settings_store.py',
+        'events.py',
+        'foreground.py',
+        'reports.py',
+        'rollups.py',
+        'export.py',
+        'archive.py',
+        'retention.py',
+        'coalescing.py',
+        'adaptive.py',
+        'process_cache.py',
+        'platforms.py',
+        'platform_windows.py',
+        'platform_x11.py',
+        'platform_fake.py',
+        'metrics.py',
+        'profiler.py',
+        'asgi.py',
         'requirements.txt',
         'README.md',
         'RELEASE.md'
@@ -0,0 +1,103 @@
+"""窗口标题合并与去抖
+
+浏览器、终端、音乐播放器等应用的标题每分钟会变化很多次，每个不同的标题
+都会变成一条新的会话记录。这里提供两种手段减少写入量：
+
+- TitleNormalizer: 按进程配置的正则替换规则，去掉未读计数、浏览器后缀等
+  不重要的部分，让只在这些部分不同的标题合并为同一个会话
+- SessionDebouncer: 新标题需要持续出现 min_dwell 秒才开始一个新会话，
+  已打开的会话消失后也要等 min_dwell 秒才结束，期间重新出现就继续沿用，
+  短暂闪现的标题不会产生记录
+"""
+import re
+
+
+class TitleNormalizer:
+    """按进程应用正则替换规则
+
+    Args:
+        rules: {进程名称: [[正则表达式, 替换文本], ...]}，进程名称为 '*' 的规则
+            对所有进程生效，在进程自己的规则之后执行
+    """
+
+    def __init__(self, rules):
+        self._rules = {}
+        for process_name, process_rules in rules.items():
+            compiled = []
+            for pattern, replacement in process_rules:
+                try:
+                    compiled.append((re.compile(pattern), replacement))
+                except re.error as e:
+                    print(f"忽略无效的标题规则 {process_name}: {pattern} ({e})")
+            self._rules[process_name] = compiled
+
+    def normalize(self, process_name, title):
+        """返回规范化后的标题，规则把标题替换为空时保留原标题"""
+        if not title:
+            return title
+        result = title
+        for pattern, replacement in self._rules.get(process_name, []) + self._rules.get('*', []):
+            result = pattern.sub(replacement, result)
+        result = result.strip()
+        return result or title
+
+
+class SessionDebouncer:
+    """会话去抖（只由采样线程使用）
+
+    新会话的开始时间是它首次出现的采样时间，结束时间是它第一次消失的采样时间，
+    与不做去抖时相同，不受等待时间的影响。
+    """
+
+    def __init__(self):
+        self._first_seen = {}     # 尚未打开的会话 → 首次出现的时间
+        self._missing_since = {}  # 已打开但本次没有出现的会话 → 第一次消失的时间
+
+    def update(self, observed, open_sessions, now, min_dwell):
+        """根据本次采样看到的会话计算应当处于打开状态的会话
+
+        Args:
+            observed: 本次采样中的会话集合
+            open_sessions: 当前已打开的会话集合
+            now: 采样时间（datetime）
+            min_dwell: 最短停留时间（秒），为 0 时不做去抖
+
+        Returns:
+            set: 应当处于打开状态的会话，交给 OpenSessionTable.diff 计算变化
+        """
+        effective = set()
+        for key in observed:
+            if key in open_sessions:
+                effective.add(key)
+                continue
+            first_seen = self._first_seen.setdefault(key, now)
+            if (now - first_seen).total_seconds() >= min_dwell:
+                effective.add(key)
+
+        # 等待期间消失的新标题直接丢弃
+        for key in [key for key in self._first_seen if key not in observed]:
+            del self._first_seen[key]
+
+        # 刚消失的会话在等待期内保持打开，重新出现时沿用同一条记录
+        for key in open_sessions:
+            if key in observed:
+                self._missing_since.pop(key, None)
+                continue
+            missing_since = self._missing_since.setdefault(key, now)
+            if (now - missing_since).total_seconds() < min_dwell:
+                effective.add(key)
+        return effective
+
+    def started_at(self, key, default):
+        """新会话的开始时间（首次出现的时间）"""
+        return self._first_seen.pop(key, default)
+
+    def ended_at(self, key, default):
+        """已结束会话的结束时间（第一次消失的时间）"""
+        return self._missing_since.pop(key, default)
+
+    def forget(self, keys):
+        """丢弃指定会话的等待状态（会话记录已被其他连接删除）"""
+        for key in keys:
+            self._first_seen.pop(key, None)
+            self._missing_since.pop(key, None)
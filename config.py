@@ -1,6 +1,58 @@
 # 数据保留设置
 DATA_RETENTION_SECONDS = 7 * 24 * 60 * 60  # 历史数据保留7天
 
+# 归档设置：过期记录删除前先按日期写入 Parquet 文件（需要安装 pyarrow）
+ARCHIVE_ENABLED = True
+ARCHIVE_DIR = 'archive'  # 归档目录，按 day=YYYY-MM-DD 分区
+
+# 清理设置：分批删除，每批一个短事务，避免长时间锁住数据库
+CLEANUP_BATCH_SIZE = 1000  # 每批删除的行数
+CLEANUP_BATCH_PAUSE = 0.05  # 批与批之间的暂停时间（秒），让出写锁
+VACUUM_PAGES_PER_STEP = 500  # 每步增量回收的空闲页数
+
+# 后台采样设置
+SAMPLE_INTERVAL_SECONDS = 2  # 最短采样间隔（秒），观察到变化后使用，与打开的网页数量无关
+SAMPLE_INTERVAL_MAX_SECONDS = 30  # 没有变化或用户空闲时逐步放慢到的最长间隔（秒）
+SAMPLE_INTERVAL_LOCKED_SECONDS = 120  # 锁屏时的采样间隔（秒）
+SAMPLE_BACKOFF = 2  # 每次没有变化时采样间隔乘以的倍数
+IDLE_THRESHOLD_SECONDS = 300  # 超过这么久没有键盘/鼠标输入视为空闲（秒）
+
+# 平台后端：'auto' 按运行环境选择，'windows' 使用 Win32 API，'x11' 使用 X11 和 /proc（Linux），
+# 'fake' 使用合成的进程和窗口（测试和基准测试用），'none' 不采集数据，只提供历史记录和统计接口
+PLATFORM = 'auto'
+SYNTHETIC_PROCESSES = 20  # 合成数据的进程数
+SYNTHETIC_WINDOWS_PER_PROCESS = 3  # 合成数据每个进程的窗口数
+
+# 前台窗口跟踪方式：'hook' 订阅系统事件（失败时自动改为轮询），'poll' 定时轮询，'none' 不跟踪
+FOREGROUND_TRACKING = 'hook'
+FOREGROUND_POLL_INTERVAL = 1.0  # 轮询间隔（秒）
+
+# 数据库连接设置
+DB_BUSY_TIMEOUT_MS = 5000  # 数据库被锁定时的最长等待时间（毫秒）
+DB_CACHE_SIZE_KB = 8192  # 每个连接的页缓存大小（KiB）
+DB_POOL_SIZE = 4  # 连接池最多保留的空闲连接数
+
+# 历史记录分页设置
+HISTORY_PAGE_SIZE = 100  # 默认每页条数
+MAX_PAGE_SIZE = 1000  # 每页最多条数
+EXPORT_BATCH_SIZE = 500  # 导出时每次从数据库读取的行数
+
+# Web 服务模式：'wsgi' 使用 Flask 自带的服务器，'asgi' 使用 uvicorn（需要安装），
+# 内存中的只读路由在事件循环中处理，数据库查询在有界线程池中执行
+SERVER_MODE = 'wsgi'
+ASGI_READ_THREADS = 4  # 执行数据库只读查询的线程数
+ASGI_MAX_QUEUED_READS = 32  # 最多排队的只读查询数，超过时返回 503
+ASGI_OTHER_THREADS = 4  # 执行其余路由（导出、性能分析等）的线程数
+
+# 性能指标（控制面板从主应用的 /metrics 读取）
+METRICS_URL = 'http://127.0.0.1:5000/metrics'
+METRICS_REFRESH_MS = 5000  # 控制面板刷新间隔（毫秒）
+
+# 采样线程的性能分析（settings.json 的 profile_seconds 或 POST /api/profile 开始，结果写在数据库文件旁边）
+PROFILE_INTERVAL_SECONDS = 0.005  # 栈采样间隔（秒）
+PROFILE_DEFAULT_SECONDS = 30  # POST /api/profile 默认的分析时长（秒）
+PROFILE_MAX_SECONDS = 600  # 单次分析的最长时长（秒）
+
 # 全局监控开关
 MONITORING_ENABLED = True  # 设置为False可以暂停所有监控
 
@@ -36,6 +88,21 @@ APP_DISPLAY_NAMES = {
 # 应用程序监控设置
 IGNORE_TITLE_CHANGES = []  # 不记录这些应用的窗口标题变化
 
+# 窗口标题合并设置（settings.json 中的 title_rules / title_min_dwell / title_flap_seconds 可以覆盖）
+TITLE_MIN_DWELL_SECONDS = 5  # 新标题至少持续这么久才记录为新的会话
+TITLE_FLAP_SECONDS = 1.0  # 前台窗口标题持续不到这么久视为闪烁，不单独记录前台时间
+
+# 标题规范化规则：{进程名称: [[正则表达式, 替换文本], ...]}，'*' 对所有进程生效
+TITLE_RULES = {
+    '*': [
+        [r'^[(（\[]\d+\+?[)）\]]\s*', ''],  # 开头的未读计数，例如 "(3) "
+    ],
+    'chrome.exe': [[r'\s+-\s+Google Chrome$', '']],
+    'msedge.exe': [[r'\s+-\s+Microsoft\W*Edge$', '']],
+    'firefox.exe': [[r'\s+[-—]\s+Mozilla Firefox$', '']],
+    'Code.exe': [[r'^●\s*', ''], [r'\s+-\s+Visual Studio Code$', '']],  # 未保存标记
+}
+
 # 完全忽略的应用列表（不会被记录）
 IGNORED_APPS = []
 
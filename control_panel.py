@@ -3,11 +3,14 @@ from tkinter import ttk, messagebox, scrolledtext
 import json
 import os
 import psutil
-import win32gui
-import win32process
 import sys
 import logging
+import urllib.request
 from datetime import datetime
+import config
+import metrics
+import platforms
+from settings_store import NameRegistry
 
 # 创建自定义的日志处理器
 class TkinterHandler(logging.Handler):
@@ -74,6 +77,8 @@ class AppMonitorControl:
         
         # 初始化配置和日志系统
         self.config_file = 'settings.json'
+        self.display_to_process = {}  # 列表中的显示名称 → 原始进程名称
+        self.platform_backend = self.load_platform_backend()
         self.original_stdout = sys.stdout
         self.original_stderr = sys.stderr
         self.log_text = scrolledtext.ScrolledText(self.root, wrap=tk.WORD, height=1)
@@ -166,12 +171,18 @@ class AppMonitorControl:
         except Exception as e:
             print(f"加载配置失败: {e}")
             self.settings = default_settings
+        self.rebuild_names()
+
+    def rebuild_names(self):
+        """根据当前设置重建名称映射"""
+        self.names = NameRegistry(config.APP_DISPLAY_NAMES, self.settings['custom_names'])
     
     def save_config(self):
         """保存配置到文件
         
         将当前设置写入JSON配置文件
         """
+        self.rebuild_names()
         try:
             with open(self.config_file, 'w', encoding='utf-8') as f:
                 json.dump(self.settings, f, ensure_ascii=False, indent=4)
@@ -198,6 +209,11 @@ class AppMonitorControl:
         notebook.add(self.settings_frame, text="设置")
         self.create_settings_page()
         
+        # 性能指标页面
+        self.metrics_frame = ttk.Frame(notebook)
+        notebook.add(self.metrics_frame, text="性能指标")
+        self.create_metrics_page()
+        
         # 日志页面
         self.log_frame = ttk.Frame(notebook)
         notebook.add(self.log_frame, text="日志")
@@ -328,6 +344,52 @@ class AppMonitorControl:
         # 更新设置列表
         self.update_settings_lists()
     
+    def create_metrics_page(self):
+        """创建性能指标页面：各阶段耗时的次数、平均值和分位数，以及计数器"""
+        columns = ('metric', 'labels', 'count', 'avg', 'p50', 'p99')
+        self.metrics_tree = ttk.Treeview(self.metrics_frame, columns=columns, show='headings', height=12)
+        for column, text, width in zip(columns, ('指标', '标签', '次数', '平均(ms)', 'p50(ms)', 'p99(ms)'),
+                                       (220, 200, 60, 80, 80, 80)):
+            self.metrics_tree.heading(column, text=text)
+            self.metrics_tree.column(column, width=width, anchor=tk.W if column in ('metric', 'labels') else tk.E)
+        self.metrics_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        self.metrics_values = tk.Listbox(self.metrics_frame, height=8)
+        self.metrics_values.pack(fill=tk.X, padx=5)
+        
+        button_frame = ttk.Frame(self.metrics_frame)
+        button_frame.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Button(button_frame, text="刷新", command=self.refresh_metrics).pack(side=tk.LEFT, padx=5)
+        self.metrics_status = ttk.Label(button_frame, text="")
+        self.metrics_status.pack(side=tk.LEFT, padx=5)
+        
+        self.refresh_metrics(schedule=True)
+    
+    def refresh_metrics(self, schedule=False):
+        """从主应用的 /metrics 读取性能指标并更新表格"""
+        try:
+            with urllib.request.urlopen(config.METRICS_URL, timeout=2) as response:
+                summary = metrics.summarize(response.read().decode('utf-8'))
+        except Exception as e:
+            self.metrics_status.configure(text=f"无法读取性能指标: {e}")
+        else:
+            self.metrics_tree.delete(*self.metrics_tree.get_children())
+            for item in summary['histograms']:
+                labels = ', '.join(f"{key}={value}" for key, value in item['labels'].items())
+                self.metrics_tree.insert('', tk.END, values=(
+                    item['name'], labels, item['count'],
+                    *('' if value is None else value for value in (item['avg_ms'], item['p50_ms'], item['p99_ms']))
+                ))
+            self.metrics_values.delete(0, tk.END)
+            for item in summary['values']:
+                labels = ', '.join(f"{key}={value}" for key, value in item['labels'].items())
+                value = int(item['value']) if float(item['value']).is_integer() else round(item['value'], 4)
+                self.metrics_values.insert(tk.END, f"{item['name']}{f' ({labels})' if labels else ''}: {value}")
+            self.metrics_status.configure(text=f"更新于 {datetime.now().strftime('%H:%M:%S')}")
+        
+        if schedule:
+            self.root.after(config.METRICS_REFRESH_MS, self.refresh_metrics, True)
+    
     def create_log_page(self):
         """创建日志页面"""
         # 创建日志文本框
@@ -370,9 +432,17 @@ class AppMonitorControl:
         for proc_name, custom_name in self.settings['custom_names'].items():
             self.name_list.insert(tk.END, f"{proc_name} → {custom_name}")
     
+    def load_platform_backend(self):
+        """加载 config.PLATFORM 指定的平台后端，不可用时不显示运行中的应用"""
+        try:
+            return platforms.load_backend(config.PLATFORM)
+        except Exception as e:
+            print(f"平台后端 {config.PLATFORM} 不可用: {e}")
+            return platforms.HeadlessBackend()
+    
     def get_display_name(self, process_name):
         """获取应用程序的显示名称"""
-        return self.settings['custom_names'].get(process_name, process_name)
+        return self.names.display_name(process_name)
     
     def update_running_apps(self):
         """更新运行中的应用列表"""
@@ -382,48 +452,34 @@ class AppMonitorControl:
         
         self.app_list.delete(0, tk.END)
         
-        # 获取所有窗口和进程信息
+        # 获取所有窗口，按进程分组窗口标题
         window_processes = {}
-        def enum_window_callback(hwnd, window_processes):
-            if win32gui.IsWindowVisible(hwnd) and win32gui.GetWindowText(hwnd):
-                try:
-                    _, pid = win32process.GetWindowThreadProcessId(hwnd)
-                    window_processes[pid] = window_processes.get(pid, [])
-                    window_processes[pid].append(hwnd)
-                except:
-                    pass
-        
-        win32gui.EnumWindows(enum_window_callback, window_processes)
+        for pid, title in self.platform_backend.enum_windows():
+            window_processes.setdefault(pid, []).append(title)
         
         # 用于存储进程及其所有窗口
         process_windows = {}
         
         # 只处理有窗口的进程
-        for pid in window_processes:
+        for pid, titles in window_processes.items():
             try:
-                proc = psutil.Process(pid)
-                process_name = proc.name()
+                process_name, _ = self.platform_backend.process_details(pid)
                 display_name = self.get_display_name(process_name)
                 
-                # 获取该进程的所有窗口标题
-                titles = []
-                for hwnd in window_processes[pid]:
-                    title = win32gui.GetWindowText(hwnd)
-                    if title:  # 只添加有标题的窗口
-                        titles.append(title)
-                
-                # 如果有窗口标题，则添加到进程字典中
-                if titles:
-                    if display_name not in process_windows:
-                        process_windows[display_name] = {
-                            'process_name': process_name,
-                            'titles': set()
-                        }
-                    process_windows[display_name]['titles'].update(titles)
+                if display_name not in process_windows:
+                    process_windows[display_name] = {
+                        'process_name': process_name,
+                        'titles': set()
+                    }
+                process_windows[display_name]['titles'].update(titles)
                     
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
                 continue
         
+        # 记录显示名称对应的原始进程名称，操作按钮直接查表
+        self.display_to_process = {display_name: info['process_name']
+                                   for display_name, info in process_windows.items()}
+        
         # 将进程和窗口添加到列表中
         new_index = 0
         selected_new_index = None
@@ -498,16 +554,13 @@ class AppMonitorControl:
         
         # 检查是否选中的是主项（进程名）
         if not app_info.startswith("    "):  # 如果不是以空格开头，说明是主项
-            process_name = app_info[2:].strip()  # 去掉前面的箭头和空格
+            display_name = app_info[2:].split(' [')[0].strip()  # 去掉前面的箭头和状态标记
         else:
             messagebox.showwarning("提示", "请选择进程名称（箭头所在行），而不是具体的窗口标题")
             return
         
         # 获取原始进程名（如果是自定义名称）
-        for proc_name, custom_name in self.settings['custom_names'].items():
-            if custom_name == process_name:
-                process_name = proc_name
-                break
+        process_name = self.display_to_process.get(display_name) or self.names.process_name(display_name)
         
         if setting_type == 'ignore_title_changes':
             if process_name in self.settings['ignore_title_changes']:
@@ -534,16 +587,13 @@ class AppMonitorControl:
         
         # 检查是否选中的是主项（进程名）
         if not app_info.startswith("    "):  # 如果不是以空格开头，说明是主项
-            process_name = app_info[2:].strip()  # 去掉前面的箭头和空格
+            display_name = app_info[2:].split(' [')[0].strip()  # 去掉前面的箭头和状态标记
         else:
             messagebox.showwarning("提示", "请选择进程名称（箭头所在行），而不是具体的窗口标题")
             return
         
         # 获取原始进程名（如果是自定义名称）
-        for proc_name, custom_name in self.settings['custom_names'].items():
-            if custom_name == process_name:
-                process_name = proc_name
-                break
+        process_name = self.display_to_process.get(display_name) or self.names.process_name(display_name)
         
         dialog = tk.Toplevel(self.root)
         dialog.title("设置显示名称")
@@ -602,10 +652,11 @@ class AppMonitorControl:
         """清空数据库"""
         if messagebox.askyesno("警告", "确定要清空所有历史数据吗？此操作不可恢复！"):
             try:
-                import sqlite3
-                conn = sqlite3.connect('app_usage.db')
+                import database
+                conn = database.connect()
                 cursor = conn.cursor()
-                cursor.execute("DELETE FROM app_usage")
+                for table in ('app_usage', 'focus_intervals', 'usage_hourly', 'usage_daily'):
+                    cursor.execute(f"DELETE FROM {table}")
                 conn.commit()
                 conn.close()
                 messagebox.showinfo("成功", "数据库已清空")
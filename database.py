@@ -0,0 +1,83 @@
+"""数据库连接管理
+
+- 所有连接使用 WAL 日志模式，读操作不会阻塞采样线程的写入
+- 每个连接统一设置 synchronous=NORMAL、忙等待超时和缓存大小
+- 连接池复用已打开的连接，避免每个函数、每个请求都重新连接
+"""
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import config
+
+DATABASE = 'app_usage.db'
+
+
+def connect(path=None):
+    """创建一个已设置好 PRAGMA 的新连接
+
+    连接可以在线程之间传递，但同一时间只能由一个线程使用
+    """
+    conn = sqlite3.connect(path or DATABASE, timeout=config.DB_BUSY_TIMEOUT_MS / 1000,
+                           check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA cache_size = -{int(config.DB_CACHE_SIZE_KB)}")  # 负数表示以 KiB 为单位
+    return conn
+
+
+def enable_wal(conn):
+    """切换到 WAL 日志模式（写入数据库文件，只需在启动时执行一次）"""
+    mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+    if mode.lower() != 'wal':
+        print(f"无法启用 WAL 模式，当前日志模式: {mode}")
+    return mode
+
+
+class ConnectionPool:
+    """简单的连接池
+
+    Args:
+        path: 数据库文件路径
+        max_idle: 最多保留的空闲连接数，多余的连接归还时直接关闭
+    """
+
+    def __init__(self, path=None, max_idle=config.DB_POOL_SIZE):
+        self.path = path
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+        self._lock = threading.Lock()
+        self.created = 0
+
+    @contextmanager
+    def connection(self):
+        """借出一个连接，使用完毕后自动归还
+
+        出错时会先回滚未提交的事务，保证归还的连接是干净的
+        """
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = connect(self.path)
+            with self._lock:
+                self.created += 1
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close_all(self):
+        """关闭所有空闲连接"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+pool = ConnectionPool()
@@ -0,0 +1,121 @@
+"""Server-Sent Events 推送
+
+采样线程在观察到变化时发布事件，每个 /stream 连接拥有一个有界队列。
+客户端处理太慢导致队列满时，清空该客户端的队列并要求它重新同步完整状态，
+而不是阻塞采样线程。在事件循环中处理的连接（ASGI）使用 asyncio.Queue，
+事件通过 call_soon_threadsafe 交给事件循环，连接在等待时不需要轮询。
+"""
+import asyncio
+import json
+import queue
+import threading
+
+RESYNC = 'resync'  # 队列溢出后发给客户端的内部事件，要求重新发送完整状态
+
+
+class AsyncSubscriber:
+    """在事件循环中读取事件的订阅者
+
+    发布线程调用 put_nowait，事件通过 call_soon_threadsafe 在事件循环中放入 asyncio.Queue，
+    队列满时同样清空并放入 RESYNC
+
+    Args:
+        loop: 读取事件的事件循环
+        maxsize: 最多缓存的事件数
+    """
+
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+
+    def put_nowait(self, item):
+        try:
+            self.loop.call_soon_threadsafe(self._put, item)
+        except RuntimeError:
+            pass  # 事件循环已经关闭
+
+    def _put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait((RESYNC, None))
+
+    async def get(self):
+        """等待下一个事件 (event, data)"""
+        return await self.queue.get()
+
+
+class EventBroadcaster:
+    """把事件广播给所有订阅者
+
+    Args:
+        max_queue: 每个订阅者最多缓存的事件数
+    """
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """订阅事件，返回该订阅者的事件队列"""
+        q = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers.add(q)
+        return q
+
+    def subscribe_async(self):
+        """在事件循环中订阅事件，返回 AsyncSubscriber（必须在协程中调用）"""
+        subscriber = AsyncSubscriber(asyncio.get_running_loop(), self.max_queue)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, q):
+        """取消订阅"""
+        with self._lock:
+            self._subscribers.discard(q)
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event, data):
+        """发布事件（不会阻塞）"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait((event, data))
+            except queue.Full:
+                # 丢弃积压的事件，让客户端重新同步
+                while True:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        break
+                q.put_nowait((RESYNC, None))
+
+
+def format_sse(event, data):
+    """格式化为 text/event-stream 消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def diff_running_apps(old_apps, new_apps):
+    """比较两次采样的运行中应用列表（以 PID 为键）
+
+    Returns:
+        dict 或 None: {'upserted': [新增或变化的应用], 'removed': [已退出的 PID]}，
+        没有变化时返回 None
+    """
+    old_by_pid = {app['pid']: app for app in old_apps}
+    new_by_pid = {app['pid']: app for app in new_apps}
+    upserted = [app for pid, app in new_by_pid.items() if old_by_pid.get(pid) != app]
+    removed = [pid for pid in old_by_pid if pid not in new_by_pid]
+    if not upserted and not removed:
+        return None
+    return {'upserted': upserted, 'removed': removed}
@@ -0,0 +1,92 @@
+"""使用记录导出
+
+从数据库游标中逐批读取记录，每读一批就转换成 NDJSON 或 CSV 文本块交给调用方，
+内存占用只与批大小有关，与导出的时间范围无关。隐藏应用的过滤和显示名称的
+替换也是逐行进行的。
+"""
+import csv
+import io
+import json
+
+# 支持的导出格式及其 MIME 类型
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# 导出的字段（与 /api/data 相同）
+FIELDS = ('name', 'title', 'start_time', 'end_time')
+
+
+def iter_usage_rows(conn, start=None, end=None, batch_size=500):
+    """按 start_time 从旧到新逐批读取使用记录
+
+    Args:
+        start, end: start_time 的范围（ISO 格式字符串，包含 start，不包含 end），None 表示不限制
+        batch_size: 每次从游标读取的行数
+
+    Yields:
+        list: [(process_name, window_title, start_time, end_time), ...]
+    """
+    conditions = []
+    params = []
+    if start:
+        conditions.append("start_time >= ?")
+        params.append(start)
+    if end:
+        conditions.append("start_time < ?")
+        params.append(end)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    cursor = conn.execute(f"""
+        SELECT process_name, window_title, start_time, end_time
+        FROM usage_view
+        {where}
+        ORDER BY start_time, id
+    """, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+
+def export_chunks(batches, fmt, hidden_apps, display_name):
+    """把记录批次转换为导出格式的文本块
+
+    Args:
+        batches: iter_usage_rows 返回的批次
+        fmt: 'ndjson' 或 'csv'
+        hidden_apps: 不导出的进程名称集合
+        display_name: 进程名称 → 显示名称的函数
+
+    Yields:
+        str: 每个批次对应一个文本块，CSV 会先输出表头
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n') if fmt == 'csv' else None
+    if writer:
+        writer.writerow(FIELDS)
+        yield buffer.getvalue()
+
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        for process_name, window_title, start_time, end_time in rows:
+            if process_name in hidden_apps:
+                continue
+            values = (display_name(process_name), window_title, start_time, end_time)
+            if writer:
+                writer.writerow(values)
+            else:
+                buffer.write(json.dumps(dict(zip(FIELDS, values)), ensure_ascii=False))
+                buffer.write('\n')
+        chunk = buffer.getvalue()
+        if chunk:
+            yield chunk
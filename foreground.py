@@ -0,0 +1,266 @@
+"""事件驱动的前台窗口跟踪
+
+ForegroundTracker 订阅前台切换和标题变化事件，记录精确的切换时间，
+用户空闲时几乎不占用 CPU。事件来源可以替换：
+- WinEventSource: SetWinEventHook 订阅系统事件（Windows）
+- PollingEventSource: 通过平台后端定时轮询前台窗口，作为钩子不可用时的后备方案
+  以及 X11 等没有事件钩子的平台的默认方式
+- ReplayEventSource: 回放预先写好的事件序列，便于在任意平台上测试
+"""
+import collections
+import threading
+import time
+
+import psutil
+
+FOREGROUND = 'foreground'  # 前台窗口切换
+TITLE = 'title'            # 前台窗口标题变化
+
+# 一个前台事件：发生时间、类型、窗口句柄、进程 ID、窗口标题
+ForegroundEvent = collections.namedtuple('ForegroundEvent', 'timestamp kind hwnd pid title')
+
+
+class ForegroundEventSource:
+    """前台事件来源接口
+
+    run(emit) 在调用线程中阻塞运行，每个事件调用一次 emit(event)，
+    stop() 可以从其他线程调用，让 run 尽快返回
+    """
+
+    def run(self, emit):
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+
+def window_event(backend, kind, hwnd):
+    """通过平台后端读取窗口的进程 ID 和标题，生成事件"""
+    pid = None
+    title = ''
+    if hwnd:
+        try:
+            pid, title = backend.window_info(hwnd)
+        except Exception:
+            pass
+    return ForegroundEvent(time.time(), kind, hwnd, pid, title)
+
+
+class WinEventSource(ForegroundEventSource):
+    """通过 SetWinEventHook 订阅前台切换和标题变化（仅 Windows）
+
+    Args:
+        backend: 读取窗口信息的平台后端（platform_windows.WindowsBackend）
+    """
+
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    EVENT_OBJECT_NAMECHANGE = 0x800C
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    WINEVENT_SKIPOWNPROCESS = 0x0002
+    OBJID_WINDOW = 0
+    WM_QUIT = 0x0012
+
+    def __init__(self, backend):
+        import ctypes
+        from ctypes import wintypes
+        self._ctypes = ctypes
+        self._wintypes = wintypes
+        self._user32 = ctypes.windll.user32
+        self._kernel32 = ctypes.windll.kernel32
+        self._backend = backend
+        self._thread_id = None
+
+    def run(self, emit):
+        ctypes = self._ctypes
+        wintypes = self._wintypes
+        user32 = self._user32
+        backend = self._backend
+
+        proc_type = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                       wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+
+        def callback(hook, event, hwnd, id_object, id_child, thread, event_time):
+            if event == self.EVENT_SYSTEM_FOREGROUND:
+                emit(window_event(backend, FOREGROUND, hwnd))
+            elif id_object == self.OBJID_WINDOW and hwnd and hwnd == backend.foreground_window():
+                # 标题变化事件来自所有窗口，只关心当前前台窗口
+                emit(window_event(backend, TITLE, hwnd))
+
+        # 回调对象必须在钩子存在期间保持引用
+        self._callback = proc_type(callback)
+        flags = self.WINEVENT_OUTOFCONTEXT | self.WINEVENT_SKIPOWNPROCESS
+        hooks = [
+            user32.SetWinEventHook(self.EVENT_SYSTEM_FOREGROUND, self.EVENT_SYSTEM_FOREGROUND,
+                                   0, self._callback, 0, 0, flags),
+            user32.SetWinEventHook(self.EVENT_OBJECT_NAMECHANGE, self.EVENT_OBJECT_NAMECHANGE,
+                                   0, self._callback, 0, 0, flags),
+        ]
+        if not all(hooks):
+            for hook in hooks:
+                if hook:
+                    user32.UnhookWinEvent(hook)
+            raise OSError("SetWinEventHook 失败")
+
+        self._thread_id = self._kernel32.GetCurrentThreadId()
+        try:
+            # 先发送当前的前台窗口，之后只在变化时发送
+            emit(window_event(backend, FOREGROUND, backend.foreground_window()))
+            msg = wintypes.MSG()
+            while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+        finally:
+            for hook in hooks:
+                user32.UnhookWinEvent(hook)
+            self._thread_id = None
+
+    def stop(self):
+        if self._thread_id is not None:
+            self._user32.PostThreadMessageW(self._thread_id, self.WM_QUIT, 0, 0)
+
+
+class PollingEventSource(ForegroundEventSource):
+    """定时轮询前台窗口，只在窗口或标题变化时发送事件
+
+    Args:
+        backend: 提供 foreground_window() 和 window_info(hwnd) 的平台后端（见 platforms.py）
+        interval: 轮询间隔（秒）
+    """
+
+    def __init__(self, backend, interval=1.0):
+        self.backend = backend
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self, emit):
+        last_hwnd = None
+        last_title = None
+        while not self._stopped.is_set():
+            hwnd = self.backend.foreground_window()
+            event = window_event(self.backend, FOREGROUND, hwnd)
+            if hwnd != last_hwnd:
+                emit(event)
+            elif event.title != last_title:
+                emit(event._replace(kind=TITLE))
+            last_hwnd, last_title = hwnd, event.title
+            self._stopped.wait(self.interval)
+
+    def stop(self):
+        self._stopped.set()
+
+
+class ReplayEventSource(ForegroundEventSource):
+    """回放事件序列
+
+    Args:
+        events: ForegroundEvent 列表
+        realtime: 为 True 时按事件时间戳的间隔等待，否则立即发送全部事件
+    """
+
+    def __init__(self, events, realtime=False):
+        self.events = list(events)
+        self.realtime = realtime
+        self._stopped = threading.Event()
+
+    def run(self, emit):
+        previous = None
+        for event in self.events:
+            if self._stopped.is_set():
+                break
+            if self.realtime and previous is not None:
+                self._stopped.wait(max(event.timestamp - previous, 0))
+            previous = event.timestamp
+            emit(event)
+
+    def stop(self):
+        self._stopped.set()
+
+
+def _psutil_process_name(pid):
+    return psutil.Process(pid).name()
+
+
+class ForegroundTracker:
+    """跟踪当前前台窗口
+
+    Args:
+        source: 前台事件来源
+        fallback: source 启动失败时使用的后备事件来源（可选）
+        resolve_process_name: 根据 PID 获取进程名称的函数，默认使用 psutil
+        history_size: 保留的最近切换记录数
+    """
+
+    def __init__(self, source, fallback=None, resolve_process_name=_psutil_process_name, history_size=100):
+        self.source = source
+        self.fallback = fallback
+        self.resolve_process_name = resolve_process_name
+        self.switches = collections.deque(maxlen=history_size)
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._current = None
+        self._thread = None
+
+    def add_listener(self, listener):
+        """添加监听器，前台窗口或标题变化后调用 listener(current, previous)"""
+        self._listeners.append(listener)
+
+    @property
+    def current(self):
+        """当前前台窗口信息，还没有收到事件时为 None
+
+        字典包含：hwnd, pid, process_name, window_title, since（切换到该窗口的时间戳）
+        """
+        with self._lock:
+            return dict(self._current) if self._current else None
+
+    def handle_event(self, event):
+        """处理一个前台事件"""
+        with self._lock:
+            previous = self._current
+            if previous is not None and event.hwnd == previous['hwnd'] and event.pid == previous['pid']:
+                if event.title == previous['window_title']:
+                    return
+                # 同一个窗口的标题变化，沿用已解析的进程名称
+                current = dict(previous, window_title=event.title, since=event.timestamp)
+            else:
+                process_name = None
+                if event.pid:
+                    try:
+                        process_name = self.resolve_process_name(event.pid)
+                    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                        pass
+                current = {
+                    'hwnd': event.hwnd,
+                    'pid': event.pid,
+                    'process_name': process_name,
+                    'window_title': event.title,
+                    'since': event.timestamp
+                }
+            self._current = current
+            self.switches.append((event.timestamp, event.kind, current['process_name'], current['window_title']))
+
+        for listener in self._listeners:
+            try:
+                listener(dict(current), previous)
+            except Exception as e:
+                print(f"前台事件监听器出错: {e}")
+
+    def run(self):
+        """在当前线程中运行事件来源，主事件来源失败时切换到后备来源"""
+        try:
+            self.source.run(self.handle_event)
+        except Exception as e:
+            if self.fallback is None:
+                raise
+            print(f"前台事件钩子不可用，改为轮询: {e}")
+            self.source = self.fallback
+            self.fallback = None
+            self.source.run(self.handle_event)
+
+    def start(self):
+        """在后台线程中开始跟踪"""
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.source.stop()
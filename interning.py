@@ -0,0 +1,47 @@
+"""字符串驻留缓存
+
+把进程名称和窗口标题映射为字典表（processes / titles）中的整数 ID。
+已经见过的字符串直接从内存中取 ID，不需要访问数据库。
+"""
+
+
+class InternTable:
+    """单个字典表的驻留缓存
+
+    Args:
+        table: 字典表名
+        column: 保存字符串的列名
+        max_size: 缓存的最大条目数，超过后清空重建（窗口标题可能非常多）
+    """
+
+    def __init__(self, table, column, max_size=50000):
+        self.table = table
+        self.column = column
+        self.max_size = max_size
+        self._cache = {}
+
+    def get_id(self, conn, value):
+        """获取字符串对应的 ID，不存在时插入字典表
+
+        必须在调用方的写事务中执行，事务回滚后需要调用 clear()
+        """
+        value = value or ''
+        value_id = self._cache.get(value)
+        if value_id is not None:
+            return value_id
+
+        row = conn.execute(f"SELECT id FROM {self.table} WHERE {self.column} = ?", (value,)).fetchone()
+        if row is None:
+            value_id = conn.execute(f"INSERT INTO {self.table} ({self.column}) VALUES (?)", (value,)).lastrowid
+        else:
+            value_id = row[0]
+
+        if len(self._cache) >= self.max_size:
+            self._cache.clear()
+        self._cache[value] = value_id
+        return value_id
+
+    def clear(self):
+        """清空缓存"""
+        self._cache.clear()
+
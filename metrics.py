@@ -0,0 +1,289 @@
+"""内存中的性能指标
+
+计数器（Counter）、直方图（Histogram）和回调仪表（Gauge）都保存在进程内，
+通过 render() 输出 Prometheus 文本格式（/metrics）。记录一次耗时只需要一次
+perf_counter、一次二分查找和一次加锁，开销在微秒以下。
+
+控制面板运行在另一个进程中，用 summarize() 解析 /metrics 的文本，
+得到每个直方图的次数、平均值和估算的分位数。
+"""
+import bisect
+import re
+import threading
+import time
+
+# 默认的耗时分桶上界（秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """只增不减的计数器
+
+    Args:
+        name: 指标名称，按 Prometheus 的习惯以 _total 结尾
+        help: 说明
+        labelnames: 标签名称
+    """
+
+    type = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # 标签值 → 计数
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        """增加计数，labelvalues 按 labelnames 的顺序给出"""
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for labelvalues, value in values:
+            yield f'{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}'
+
+
+class _Timer:
+    """直方图的计时上下文"""
+
+    __slots__ = ('_histogram', '_labelvalues', '_started')
+
+    def __init__(self, histogram, labelvalues):
+        self._histogram = histogram
+        self._labelvalues = labelvalues
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._histogram.observe(time.perf_counter() - self._started, *self._labelvalues)
+
+
+class Histogram:
+    """分桶统计的直方图
+
+    Args:
+        name: 指标名称，耗时以 _seconds 结尾
+        help: 说明
+        labelnames: 标签名称
+        buckets: 递增的分桶上界
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # 标签值 → [各分桶的计数（不累计，最后一个是 +Inf）, 总和, 次数]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        """记录一个观测值，labelvalues 按 labelnames 的顺序给出"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labelvalues):
+        """返回一个计时上下文，退出时记录经过的秒数"""
+        return _Timer(self, labelvalues)
+
+    def collect(self):
+        with self._lock:
+            series = sorted((labelvalues, (list(counts), total, count))
+                            for labelvalues, (counts, total, count) in self._series.items())
+        for labelvalues, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, labelvalues, f'le="{_format_value(bound)}"')
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield f'{self.name}_sum{labels} {_format_value(total)}'
+            yield f'{self.name}_count{labels} {count}'
+
+
+class Gauge:
+    """在输出时调用 func() 读取当前值的仪表，func 返回 None 时不输出"""
+
+    type = 'gauge'
+
+    def __init__(self, name, help, func):
+        self.name = name
+        self.help = help
+        self.func = func
+        self.labelnames = ()
+
+    def collect(self):
+        try:
+            value = self.func()
+        except Exception:
+            return
+        if value is not None:
+            yield f'{self.name} {_format_value(value)}'
+
+
+class Registry:
+    """指标的集合"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标已存在: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        """输出 Prometheus 文本格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def counter(name, help, labelnames=()):
+    """创建并注册一个计数器"""
+    return REGISTRY.register(Counter(name, help, labelnames))
+
+
+def histogram(name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+    """创建并注册一个直方图"""
+    return REGISTRY.register(Histogram(name, help, labelnames, buckets))
+
+
+def gauge(name, help, func):
+    """创建并注册一个回调仪表"""
+    return REGISTRY.register(Gauge(name, help, func))
+
+
+def render():
+    """输出默认集合中所有指标的 Prometheus 文本格式"""
+    return REGISTRY.render()
+
+
+_SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)$')
+_LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+def parse_text(text):
+    """解析 Prometheus 文本格式
+
+    Returns:
+        tuple: (类型, 样本)。类型为 指标名称 → 类型，样本为 (名称, 标签字典, 值) 列表
+    """
+    types = {}
+    samples = []
+    for line in text.splitlines():
+        if line.startswith('# TYPE '):
+            parts = line.split()
+            if len(parts) == 4:
+                types[parts[2]] = parts[3]
+            continue
+        match = _SAMPLE.match(line)
+        if match is None:
+            continue
+        name, labels, value = match.groups()
+        labels = {key: re.sub(r'\\(.)', lambda m: '\n' if m.group(1) == 'n' else m.group(1), raw)
+                  for key, raw in _LABEL.findall(labels or '')}
+        samples.append((name, labels, float(value)))
+    return types, samples
+
+
+def _quantile(q, buckets, count):
+    """按分桶线性插值估算分位数（与 Prometheus 的 histogram_quantile 相同）"""
+    if not count:
+        return None
+    rank = q * count
+    previous_bound, previous_count = 0.0, 0
+    for bound, cumulative in buckets:
+        if cumulative >= rank:
+            if bound == float('inf'):
+                return previous_bound  # 落在最后一个桶，只能给出下界
+            if cumulative == previous_count:
+                return bound
+            return previous_bound + (bound - previous_bound) * (rank - previous_count) / (cumulative - previous_count)
+        previous_bound, previous_count = bound, cumulative
+    return previous_bound
+
+
+def summarize(text):
+    """汇总 /metrics 的文本，供控制面板显示
+
+    Returns:
+        dict:
+        - histograms: 每个直方图序列的 name, labels, count, avg_ms, p50_ms, p99_ms
+        - values: 计数器和仪表的 name, labels, value
+    """
+    types, samples = parse_text(text)
+    series = {}
+    values = []
+    for name, labels, value in samples:
+        for suffix in ('_bucket', '_sum', '_count'):
+            base = name[:-len(suffix)]
+            if name.endswith(suffix) and types.get(base) == 'histogram':
+                le = labels.pop('le', None)
+                entry = series.setdefault((base, tuple(sorted(labels.items()))),
+                                          {'buckets': [], 'sum': 0.0, 'count': 0})
+                if suffix == '_bucket':
+                    entry['buckets'].append((float(le), value))
+                else:
+                    entry[suffix[1:]] = value
+                break
+        else:
+            values.append({'name': name, 'labels': labels, 'value': value})
+
+    histograms = []
+    for (name, labels), entry in sorted(series.items()):
+        buckets = sorted(entry['buckets'])
+        count = int(entry['count'])
+        p50 = _quantile(0.5, buckets, count)
+        p99 = _quantile(0.99, buckets, count)
+        histograms.append({
+            'name': name,
+            'labels': dict(labels),
+            'count': count,
+            'avg_ms': round(entry['sum'] / count * 1000, 3) if count else None,
+            'p50_ms': round(p50 * 1000, 3) if p50 is not None else None,
+            'p99_ms': round(p99 * 1000, 3) if p99 is not None else None,
+        })
+    return {'histograms': histograms, 'values': values}
@@ -0,0 +1,321 @@
+"""数据库结构迁移
+
+schema_version 表记录已经执行过的迁移版本。MIGRATIONS 按版本号顺序列出
+所有迁移，启动时只执行尚未执行的部分，因此旧版本用户的数据库可以原地升级。
+
+新增迁移时在列表末尾追加，不要修改已经发布的迁移。
+"""
+import datetime
+
+import config
+import rollups
+
+
+def _create_app_usage(conn):
+    """创建 app_usage 表（旧版本数据库中已存在时跳过）"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS app_usage (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            process_name TEXT,
+            window_title TEXT,
+            start_time TEXT,
+            end_time TEXT,
+            is_foreground INTEGER  -- 1 表示前台, 0 表示后台
+        )
+    ''')
+
+
+def _add_app_usage_indexes(conn):
+    """为常用查询添加索引
+
+    - 未结束会话的部分索引：启动时重建会话表、结束时间更新
+    - (process_name, window_title) 复合索引：按应用和标题查找、清除隐藏应用
+    - start_time 索引：历史记录排序和过期数据清理
+    """
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_app_usage_open
+        ON app_usage (process_name, window_title)
+        WHERE end_time IS NULL
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_app_usage_process_title
+        ON app_usage (process_name, window_title)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_app_usage_start_time
+        ON app_usage (start_time)
+    ''')
+
+
+def _normalize_names_and_titles(conn):
+    """把进程名称和窗口标题移到字典表中
+
+    app_usage 只保存 processes / titles 表的整数 ID，重复的字符串只存一份。
+    usage_view 视图把 ID 还原成字符串，供只读查询使用。
+    """
+    conn.execute('''
+        CREATE TABLE processes (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE titles (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL UNIQUE
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO processes (name)
+        SELECT DISTINCT IFNULL(process_name, '') FROM app_usage
+    ''')
+    conn.execute('''
+        INSERT INTO titles (title)
+        SELECT DISTINCT IFNULL(window_title, '') FROM app_usage
+    ''')
+
+    conn.execute('''
+        CREATE TABLE app_usage_normalized (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            process_id INTEGER NOT NULL REFERENCES processes (id),
+            title_id INTEGER NOT NULL REFERENCES titles (id),
+            start_time TEXT,
+            end_time TEXT,
+            is_foreground INTEGER  -- 1 表示前台, 0 表示后台
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO app_usage_normalized (id, process_id, title_id, start_time, end_time, is_foreground)
+        SELECT u.id, p.id, t.id, u.start_time, u.end_time, u.is_foreground
+        FROM app_usage u
+        JOIN processes p ON p.name = IFNULL(u.process_name, '')
+        JOIN titles t ON t.title = IFNULL(u.window_title, '')
+    ''')
+    conn.execute("DROP TABLE app_usage")  # 旧表的索引会一起删除
+    conn.execute("ALTER TABLE app_usage_normalized RENAME TO app_usage")
+
+    conn.execute('''
+        CREATE INDEX idx_app_usage_open
+        ON app_usage (process_id, title_id)
+        WHERE end_time IS NULL
+    ''')
+    conn.execute('''
+        CREATE INDEX idx_app_usage_process_title
+        ON app_usage (process_id, title_id)
+    ''')
+    conn.execute('''
+        CREATE INDEX idx_app_usage_start_time
+        ON app_usage (start_time)
+    ''')
+
+    conn.execute('''
+        CREATE VIEW usage_view AS
+        SELECT u.id, p.name AS process_name, t.title AS window_title,
+               u.start_time, u.end_time, u.is_foreground
+        FROM app_usage u
+        JOIN processes p ON p.id = u.process_id
+        JOIN titles t ON t.id = u.title_id
+    ''')
+
+
+def _create_focus_intervals(conn):
+    """创建前台时间区间表
+
+    每一行表示某个会话（进程 + 窗口标题）从 start_time 到 end_time 持有焦点，
+    end_time 为 NULL 表示当前仍在前台。usage_id 指向写入时对应的 app_usage 记录。
+    """
+    conn.execute('''
+        CREATE TABLE focus_intervals (
+            id INTEGER PRIMARY KEY,
+            usage_id INTEGER REFERENCES app_usage (id),
+            process_id INTEGER NOT NULL REFERENCES processes (id),
+            title_id INTEGER NOT NULL REFERENCES titles (id),
+            start_time TEXT NOT NULL,
+            end_time TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX idx_focus_intervals_start_time
+        ON focus_intervals (start_time)
+    ''')
+    conn.execute('''
+        CREATE INDEX idx_focus_intervals_open
+        ON focus_intervals (end_time)
+        WHERE end_time IS NULL
+    ''')
+
+
+def _create_usage_rollups(conn):
+    """创建按小时/天预聚合的使用时间表，并根据已有记录生成初始数据"""
+    conn.execute('''
+        CREATE TABLE usage_hourly (
+            day TEXT NOT NULL,  -- YYYY-MM-DD
+            hour INTEGER NOT NULL,
+            process_id INTEGER NOT NULL REFERENCES processes (id),
+            open_seconds REAL NOT NULL DEFAULT 0,
+            focused_seconds REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, hour, process_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE usage_daily (
+            day TEXT NOT NULL,  -- YYYY-MM-DD
+            process_id INTEGER NOT NULL REFERENCES processes (id),
+            open_seconds REAL NOT NULL DEFAULT 0,
+            focused_seconds REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, process_id)
+        ) WITHOUT ROWID
+    ''')
+    rollups.rebuild(conn)
+
+
+def _restore_raw_process_names(conn):
+    """把旧版本按显示名称写入的进程恢复为原始进程名称
+
+    旧版本写入前用 config.APP_DISPLAY_NAMES 把进程名称转换成显示名称（例如 'Google Chrome'），
+    现在写入的是原始名称（'chrome.exe'），同一个应用在 processes 中有两行。
+    只有显示名称的一行直接改名；两行都存在时把所有表中的 process_id 合并到原始名称的一行，
+    聚合表中同一时间段的两行相加
+    """
+    for raw_name, display_name in config.APP_DISPLAY_NAMES.items():
+        if raw_name == display_name:
+            continue
+        old = conn.execute("SELECT id FROM processes WHERE name = ?", (display_name,)).fetchone()
+        if old is None:
+            continue
+        new = conn.execute("SELECT id FROM processes WHERE name = ?", (raw_name,)).fetchone()
+        if new is None:
+            conn.execute("UPDATE processes SET name = ? WHERE id = ?", (raw_name, old[0]))
+            continue
+
+        old_id, new_id = old[0], new[0]
+        for table in ('app_usage', 'focus_intervals'):
+            conn.execute(f"UPDATE {table} SET process_id = ? WHERE process_id = ?", (new_id, old_id))
+        conn.execute('''
+            INSERT INTO usage_hourly (day, hour, process_id, open_seconds, focused_seconds)
+            SELECT day, hour, ?, open_seconds, focused_seconds FROM usage_hourly WHERE process_id = ?
+            ON CONFLICT (day, hour, process_id) DO UPDATE SET
+                open_seconds = open_seconds + excluded.open_seconds,
+                focused_seconds = focused_seconds + excluded.focused_seconds
+        ''', (new_id, old_id))
+        conn.execute('''
+            INSERT INTO usage_daily (day, process_id, open_seconds, focused_seconds)
+            SELECT day, ?, open_seconds, focused_seconds FROM usage_daily WHERE process_id = ?
+            ON CONFLICT (day, process_id) DO UPDATE SET
+                open_seconds = open_seconds + excluded.open_seconds,
+                focused_seconds = focused_seconds + excluded.focused_seconds
+        ''', (new_id, old_id))
+        conn.execute("DELETE FROM usage_hourly WHERE process_id = ?", (old_id,))
+        conn.execute("DELETE FROM usage_daily WHERE process_id = ?", (old_id,))
+        conn.execute("DELETE FROM processes WHERE id = ?", (old_id,))
+
+
+def _add_process_start_index(conn):
+    """为按应用筛选的历史记录分页添加 (process_id, start_time) 索引
+
+    usage_view 同时输出 process_id，查询先把进程名称解析成 ID，
+    再沿该索引按 (start_time, id) 顺序扫描，不需要临时排序
+    """
+    conn.execute('''
+        CREATE INDEX idx_app_usage_process_start
+        ON app_usage (process_id, start_time)
+    ''')
+    conn.execute("DROP VIEW usage_view")
+    conn.execute('''
+        CREATE VIEW usage_view AS
+        SELECT u.id, u.process_id, p.name AS process_name, t.title AS window_title,
+               u.start_time, u.end_time, u.is_foreground
+        FROM app_usage u
+        JOIN processes p ON p.id = u.process_id
+        JOIN titles t ON t.id = u.title_id
+    ''')
+
+
+def _drop_focus_usage_id(conn):
+    """删除 focus_intervals.usage_id
+
+    焦点切换先于会话写入（会话要经过 TITLE_MIN_DWELL 防抖），并且忽略标题变化的应用
+    前台区间的标题是显示名称、会话的标题是第一个窗口标题，写入时查到的 usage_id 大多为 NULL，
+    也没有查询使用它。前台区间与会话按 (process_id, title_id) 和时间重叠关联，
+    忽略标题变化的应用只按 process_id 关联。
+    带外键约束的列不能 DROP COLUMN，因此重建表
+    """
+    conn.execute('''
+        CREATE TABLE focus_intervals_new (
+            id INTEGER PRIMARY KEY,
+            process_id INTEGER NOT NULL REFERENCES processes (id),
+            title_id INTEGER NOT NULL REFERENCES titles (id),
+            start_time TEXT NOT NULL,
+            end_time TEXT
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO focus_intervals_new (id, process_id, title_id, start_time, end_time)
+        SELECT id, process_id, title_id, start_time, end_time FROM focus_intervals
+    ''')
+    conn.execute("DROP TABLE focus_intervals")
+    conn.execute("ALTER TABLE focus_intervals_new RENAME TO focus_intervals")
+    conn.execute('''
+        CREATE INDEX idx_focus_intervals_start_time
+        ON focus_intervals (start_time)
+    ''')
+    conn.execute('''
+        CREATE INDEX idx_focus_intervals_open
+        ON focus_intervals (end_time)
+        WHERE end_time IS NULL
+    ''')
+
+
+# (版本号, 说明, 迁移函数)
+MIGRATIONS = [
+    (1, 'create app_usage', _create_app_usage),
+    (2, 'add app_usage indexes', _add_app_usage_indexes),
+    (3, 'normalize process names and window titles', _normalize_names_and_titles),
+    (4, 'create focus_intervals', _create_focus_intervals),
+    (5, 'create usage rollups', _create_usage_rollups),
+    (6, 'restore raw process names', _restore_raw_process_names),
+    (7, 'add app_usage process/start_time index', _add_process_start_index),
+    (8, 'drop focus_intervals.usage_id', _drop_focus_usage_id),
+]
+
+
+def get_version(conn):
+    """获取数据库当前的结构版本，未执行过任何迁移时返回 0"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TEXT
+        )
+    ''')
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate(conn):
+    """执行所有尚未执行的迁移
+
+    每个迁移在独立的事务中执行，失败时回滚且不会记录版本号
+
+    Returns:
+        int: 迁移后的结构版本
+    """
+    version = get_version(conn)
+    conn.commit()
+    for target, description, upgrade in MIGRATIONS:
+        if target <= version:
+            continue
+        try:
+            conn.execute("BEGIN")
+            upgrade(conn)
+            conn.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (target, description, datetime.datetime.now().isoformat())
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"数据库已升级到版本 {target}: {description}")
+        version = target
+    return version
@@ -0,0 +1,78 @@
+"""内存中的合成平台后端
+
+生成固定数量的进程和窗口，前台窗口、空闲时间和锁屏状态都由调用方设置，
+可以在任意平台上运行采集流程，用于测试和基准测试。
+"""
+import psutil
+
+from platforms import PlatformBackend
+
+
+class FakeBackend(PlatformBackend):
+    """合成的进程和窗口
+
+    生成 num_processes 个进程，每个进程 windows_per_process 个窗口。
+    窗口的 hwnd 为它在 windows 中的下标加 1。
+
+    Args:
+        num_processes: 进程数
+        windows_per_process: 每个进程的窗口数
+        base_pid: 第一个进程的 PID
+        create_time: 第一个进程的启动时间戳，之后的进程依次加 1 秒
+    """
+
+    name = 'fake'
+
+    def __init__(self, num_processes=20, windows_per_process=3, base_pid=1000, create_time=0.0):
+        self.processes = {}
+        self.windows = []
+        self.foreground = None  # 前台窗口的 hwnd
+        self.idle = 0.0
+        self.locked = False
+        self._churned = 0
+        for i in range(num_processes):
+            pid = base_pid + i
+            self.processes[pid] = (f"app{i}.exe", create_time + i)
+            for j in range(windows_per_process):
+                self.windows.append((pid, f"app{i} - window {j}"))
+
+    def churn(self, fraction, rng):
+        """随机修改一部分窗口的标题，模拟标题变化
+
+        Args:
+            fraction: 修改的窗口比例（0 ~ 1）
+            rng: random.Random 实例
+        """
+        count = round(len(self.windows) * fraction)
+        for index in rng.sample(range(len(self.windows)), count):
+            pid, title = self.windows[index]
+            self._churned += 1
+            self.windows[index] = (pid, f"{title.split(' #')[0]} #{self._churned}")
+
+    def enum_windows(self):
+        return list(self.windows)
+
+    def foreground_window(self):
+        return self.foreground
+
+    def window_info(self, hwnd):
+        return self.windows[hwnd - 1]
+
+    def idle_seconds(self):
+        return self.idle
+
+    def is_locked(self):
+        return self.locked
+
+    def create_time(self, pid):
+        try:
+            return self.processes[pid][1]
+        except KeyError:
+            raise psutil.NoSuchProcess(pid)
+
+    def process_details(self, pid):
+        try:
+            process_name = self.processes[pid][0]
+        except KeyError:
+            raise psutil.NoSuchProcess(pid)
+        return process_name, f"C:\\Program Files\\{process_name}"
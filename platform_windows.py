@@ -0,0 +1,77 @@
+"""Windows 平台后端
+
+窗口枚举和前台窗口使用 pywin32，空闲时间和锁屏状态通过 ctypes 调用
+GetLastInputInfo / OpenInputDesktop，前台切换默认用 SetWinEventHook 订阅。
+"""
+import ctypes
+
+import win32gui
+import win32process
+
+from platforms import PlatformBackend
+
+
+class WindowsBackend(PlatformBackend):
+    """基于 Win32 API 的平台后端"""
+
+    name = 'windows'
+    DESKTOP_SWITCHDESKTOP = 0x0100
+
+    def __init__(self):
+        from ctypes import wintypes
+
+        class LASTINPUTINFO(ctypes.Structure):
+            _fields_ = [('cbSize', wintypes.UINT), ('dwTime', wintypes.DWORD)]
+
+        self._user32 = ctypes.windll.user32
+        self._kernel32 = ctypes.windll.kernel32
+        self._kernel32.GetTickCount.restype = wintypes.DWORD
+        self._user32.OpenInputDesktop.restype = wintypes.HANDLE
+        self._user32.OpenInputDesktop.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.DWORD]
+        self._user32.SwitchDesktop.argtypes = [wintypes.HANDLE]
+        self._user32.CloseDesktop.argtypes = [wintypes.HANDLE]
+        self._info = LASTINPUTINFO()
+        self._info.cbSize = ctypes.sizeof(LASTINPUTINFO)
+
+    def enum_windows(self):
+        get_pid = win32process.GetWindowThreadProcessId
+
+        def callback(hwnd, windows):
+            if win32gui.IsWindowVisible(hwnd):
+                window_title = win32gui.GetWindowText(hwnd)
+                if window_title:
+                    windows.append((get_pid(hwnd)[1], window_title))
+
+        windows = []
+        win32gui.EnumWindows(callback, windows)
+        return windows
+
+    def foreground_window(self):
+        return win32gui.GetForegroundWindow()
+
+    def window_info(self, hwnd):
+        return win32process.GetWindowThreadProcessId(hwnd)[1], win32gui.GetWindowText(hwnd)
+
+    def idle_seconds(self):
+        if not self._user32.GetLastInputInfo(ctypes.byref(self._info)):
+            return 0.0
+        # 两个值都是 32 位的毫秒计数，回绕后相减仍然正确
+        return ((self._kernel32.GetTickCount() - self._info.dwTime) & 0xFFFFFFFF) / 1000
+
+    def is_locked(self):
+        # 锁屏时输入桌面切换为安全桌面，无法打开或切换
+        desktop = self._user32.OpenInputDesktop(0, False, self.DESKTOP_SWITCHDESKTOP)
+        if not desktop:
+            return True
+        try:
+            return not self._user32.SwitchDesktop(desktop)
+        finally:
+            self._user32.CloseDesktop(desktop)
+
+    def foreground_sources(self, use_hooks, poll_interval):
+        """use_hooks 为 True 时订阅系统事件，失败时改为轮询"""
+        from foreground import WinEventSource, PollingEventSource
+        polling = PollingEventSource(self, poll_interval)
+        if use_hooks:
+            return WinEventSource(self), polling
+        return polling, None
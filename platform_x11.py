@@ -0,0 +1,211 @@
+"""X11 / procfs 平台后端（Linux）
+
+通过 ctypes 调用 libX11，从窗口管理器维护的 EWMH 属性读取窗口信息：
+- _NET_CLIENT_LIST: 所有顶层窗口
+- _NET_ACTIVE_WINDOW: 前台窗口
+- _NET_WM_PID: 窗口所属的进程 ID
+- _NET_WM_NAME / WM_NAME: 窗口标题
+
+空闲时间和锁屏状态来自 XScreenSaver 扩展（libXss，可选，缺少时视为永不空闲）。
+进程名称、路径和启动时间直接从 /proc 读取。不需要 pywin32 或其他第三方库，
+但窗口管理器必须支持 EWMH（主流桌面环境都支持）。
+"""
+import ctypes
+import ctypes.util
+import os
+import threading
+
+import psutil
+
+from platforms import PlatformBackend
+
+_Display = ctypes.c_void_p
+_Window = ctypes.c_ulong
+_Atom = ctypes.c_ulong
+
+_SUCCESS = 0
+_ANY_PROPERTY_TYPE = 0
+_SCREEN_SAVER_ON = 1
+_MAX_PROPERTY_LENGTH = 0x7FFFFFFF
+
+
+class _XScreenSaverInfo(ctypes.Structure):
+    _fields_ = [
+        ('window', _Window),
+        ('state', ctypes.c_int),
+        ('kind', ctypes.c_int),
+        ('til_or_since', ctypes.c_ulong),
+        ('idle', ctypes.c_ulong),
+        ('eventMask', ctypes.c_ulong),
+    ]
+
+
+# X 协议错误（例如读取属性时窗口已经关闭）默认会结束进程，这里改为忽略
+_ERROR_HANDLER_TYPE = ctypes.CFUNCTYPE(ctypes.c_int, _Display, ctypes.c_void_p)
+_ignore_errors = _ERROR_HANDLER_TYPE(lambda display, event: 0)
+
+
+def _load_library(name):
+    path = ctypes.util.find_library(name)
+    if path is None:
+        raise OSError(f"找不到 lib{name}")
+    return ctypes.CDLL(path)
+
+
+class X11Backend(PlatformBackend):
+    """基于 libX11 和 /proc 的平台后端
+
+    Args:
+        display: X 显示名称，默认使用环境变量 DISPLAY
+    """
+
+    name = 'x11'
+
+    def __init__(self, display=None):
+        xlib = _load_library('X11')
+        xlib.XOpenDisplay.restype = _Display
+        xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        xlib.XDefaultRootWindow.restype = _Window
+        xlib.XDefaultRootWindow.argtypes = [_Display]
+        xlib.XInternAtom.restype = _Atom
+        xlib.XInternAtom.argtypes = [_Display, ctypes.c_char_p, ctypes.c_int]
+        xlib.XGetWindowProperty.argtypes = [
+            _Display, _Window, _Atom, ctypes.c_long, ctypes.c_long, ctypes.c_int, _Atom,
+            ctypes.POINTER(_Atom), ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_ulong),
+            ctypes.POINTER(ctypes.c_ulong), ctypes.POINTER(ctypes.c_void_p)
+        ]
+        xlib.XFree.argtypes = [ctypes.c_void_p]
+        xlib.XSetErrorHandler(_ignore_errors)
+
+        self._xlib = xlib
+        self._display = xlib.XOpenDisplay(display.encode() if display else None)
+        if not self._display:
+            raise OSError(f"无法连接 X 显示: {display or os.environ.get('DISPLAY')}")
+        self._root = xlib.XDefaultRootWindow(self._display)
+        self._atoms = {
+            name: xlib.XInternAtom(self._display, name.encode(), False)
+            for name in ('_NET_CLIENT_LIST', '_NET_ACTIVE_WINDOW', '_NET_WM_PID',
+                         '_NET_WM_NAME', 'WM_NAME', 'UTF8_STRING')
+        }
+        # 同一个 Display 连接不能被多个线程同时使用（采样线程和前台轮询线程）
+        self._lock = threading.Lock()
+
+        self._xss = None
+        try:
+            xss = _load_library('Xss')
+            xss.XScreenSaverAllocInfo.restype = ctypes.POINTER(_XScreenSaverInfo)
+            xss.XScreenSaverQueryInfo.argtypes = [_Display, _Window, ctypes.POINTER(_XScreenSaverInfo)]
+            self._xss = xss
+            self._xss_info = xss.XScreenSaverAllocInfo()
+        except (OSError, AttributeError) as e:
+            print(f"空闲检测不可用: {e}")
+
+        self._clock_ticks = os.sysconf('SC_CLK_TCK')
+        self._boot_time = psutil.boot_time()
+
+    def _get_property(self, window, name, property_type=_ANY_PROPERTY_TYPE):
+        """读取窗口属性，返回 (format, 数据字节)，属性不存在时返回 (0, b'')"""
+        actual_type = _Atom()
+        actual_format = ctypes.c_int()
+        nitems = ctypes.c_ulong()
+        bytes_after = ctypes.c_ulong()
+        data = ctypes.c_void_p()
+        status = self._xlib.XGetWindowProperty(
+            self._display, window, self._atoms[name], 0, _MAX_PROPERTY_LENGTH, False, property_type,
+            ctypes.byref(actual_type), ctypes.byref(actual_format), ctypes.byref(nitems),
+            ctypes.byref(bytes_after), ctypes.byref(data)
+        )
+        if status != _SUCCESS or not data.value:
+            return 0, b''
+        try:
+            # format 为 32 的属性在客户端以 C long 数组返回
+            item_size = {8: 1, 16: ctypes.sizeof(ctypes.c_short), 32: ctypes.sizeof(ctypes.c_long)}
+            size = nitems.value * item_size.get(actual_format.value, 1)
+            return actual_format.value, ctypes.string_at(data.value, size)
+        finally:
+            self._xlib.XFree(data)
+
+    def _get_longs(self, window, name):
+        """读取 format 为 32 的属性（窗口列表、PID 等）"""
+        fmt, raw = self._get_property(window, name)
+        if fmt != 32:
+            return []
+        count = len(raw) // ctypes.sizeof(ctypes.c_ulong)
+        return list((ctypes.c_ulong * count).from_buffer_copy(raw))
+
+    def _get_title(self, window):
+        fmt, raw = self._get_property(window, '_NET_WM_NAME', self._atoms['UTF8_STRING'])
+        if fmt != 8:
+            fmt, raw = self._get_property(window, 'WM_NAME')
+        return raw.decode('utf-8', errors='replace') if fmt == 8 else ''
+
+    def _get_pid(self, window):
+        values = self._get_longs(window, '_NET_WM_PID')
+        return values[0] if values else None
+
+    def enum_windows(self):
+        windows = []
+        with self._lock:
+            for window in self._get_longs(self._root, '_NET_CLIENT_LIST'):
+                window_title = self._get_title(window)
+                if window_title:
+                    pid = self._get_pid(window)
+                    if pid:
+                        windows.append((pid, window_title))
+        return windows
+
+    def foreground_window(self):
+        with self._lock:
+            values = self._get_longs(self._root, '_NET_ACTIVE_WINDOW')
+        return values[0] if values else None
+
+    def window_info(self, hwnd):
+        with self._lock:
+            return self._get_pid(hwnd), self._get_title(hwnd)
+
+    def idle_seconds(self):
+        if self._xss is None:
+            return 0.0
+        with self._lock:
+            if not self._xss.XScreenSaverQueryInfo(self._display, self._root, self._xss_info):
+                return 0.0
+            return self._xss_info.contents.idle / 1000
+
+    def is_locked(self):
+        # 大多数锁屏程序依附于屏幕保护程序，屏保激活时视为锁屏
+        if self._xss is None:
+            return False
+        with self._lock:
+            if not self._xss.XScreenSaverQueryInfo(self._display, self._root, self._xss_info):
+                return False
+            return self._xss_info.contents.state == _SCREEN_SAVER_ON
+
+    def create_time(self, pid):
+        try:
+            with open(f'/proc/{pid}/stat', 'rb') as f:
+                stat = f.read()
+        except FileNotFoundError:
+            raise psutil.NoSuchProcess(pid)
+        # 进程名称可能包含空格和括号，从最后一个 ')' 之后开始按空格分割，
+        # 第 22 个字段 starttime 是开机后经过的时钟周期数
+        fields = stat[stat.rindex(b')') + 2:].split()
+        return self._boot_time + int(fields[19]) / self._clock_ticks
+
+    def process_details(self, pid):
+        try:
+            with open(f'/proc/{pid}/comm', encoding='utf-8', errors='replace') as f:
+                comm = f.read().rstrip('\n')
+        except FileNotFoundError:
+            raise psutil.NoSuchProcess(pid)
+        try:
+            exe = os.readlink(f'/proc/{pid}/exe')
+        except PermissionError:
+            exe = None  # 其他用户的进程无法读取路径
+        except FileNotFoundError:
+            # 进程已经退出，或者是没有可执行文件的内核线程
+            if not os.path.exists(f'/proc/{pid}'):
+                raise psutil.NoSuchProcess(pid)
+            exe = None
+        # comm 最多 15 个字符，能读取路径时使用完整的文件名
+        process_name = os.path.basename(exe) if exe else comm
+        return process_name, exe
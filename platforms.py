@@ -0,0 +1,116 @@
+"""平台抽象层
+
+采集需要的所有平台相关操作（枚举窗口、前台窗口、窗口所属进程、空闲时间、进程信息）
+都通过 PlatformBackend 接口完成。具体实现放在单独的模块中，只在启动时选中后才导入：
+
+- windows: Win32 API（platform_windows.py，需要 pywin32）
+- x11: X11 + /proc（platform_x11.py，需要 libX11，空闲检测需要 libXss）
+- fake: 内存中的合成数据（platform_fake.py，用于测试和基准测试）
+- none: 不采集任何数据，只提供历史记录和统计接口（例如分析服务器）
+
+'auto' 在 Windows 上选择 windows，在有 DISPLAY 的 Linux 上选择 x11，否则选择 none。
+"""
+import importlib
+import os
+import sys
+
+import psutil
+
+# 后端名称 → (模块, 类名)，选中后才导入对应的模块
+BACKENDS = {
+    'windows': ('platform_windows', 'WindowsBackend'),
+    'x11': ('platform_x11', 'X11Backend'),
+    'fake': ('platform_fake', 'FakeBackend'),
+}
+
+
+class PlatformBackend:
+    """平台后端接口
+
+    窗口用平台相关的标识 hwnd 表示（Windows 的窗口句柄、X11 的窗口 ID 等），
+    进程相关的方法在进程不存在时抛出 psutil 异常。
+    """
+
+    name = None
+    can_collect = True  # 是否能采集窗口和进程信息
+
+    def enum_windows(self):
+        """返回 (pid, window_title) 列表，只包含可见且有标题的顶层窗口"""
+        raise NotImplementedError
+
+    def foreground_window(self):
+        """当前前台窗口的 hwnd，没有时返回 None 或 0"""
+        raise NotImplementedError
+
+    def window_info(self, hwnd):
+        """返回窗口的 (pid, window_title)"""
+        raise NotImplementedError
+
+    def idle_seconds(self):
+        """距离最后一次键盘/鼠标输入的秒数，无法检测时返回 0"""
+        return 0.0
+
+    def is_locked(self):
+        """屏幕是否已锁定，无法检测时返回 False"""
+        return False
+
+    def create_time(self, pid):
+        """进程的启动时间戳，用来识别 PID 是否被复用"""
+        return psutil.Process(pid).create_time()
+
+    def process_details(self, pid):
+        """返回 (process_name, exe)，无法获取路径时 exe 为 None"""
+        process = psutil.Process(pid)
+        try:
+            exe = process.exe() or None
+        except (psutil.AccessDenied, psutil.ZombieProcess):
+            exe = None  # 系统进程和提升权限的进程无法读取路径
+        return process.name(), exe
+
+    def foreground_sources(self, use_hooks, poll_interval):
+        """返回前台事件来源 (source, fallback)，默认定时轮询"""
+        from foreground import PollingEventSource
+        return PollingEventSource(self, poll_interval), None
+
+
+class HeadlessBackend(PlatformBackend):
+    """不采集任何数据的后端"""
+
+    name = 'none'
+    can_collect = False
+
+    def enum_windows(self):
+        return []
+
+    def foreground_window(self):
+        return None
+
+    def window_info(self, hwnd):
+        return None, ''
+
+
+def detect():
+    """根据当前运行环境选择后端名称"""
+    if sys.platform == 'win32':
+        return 'windows'
+    if sys.platform.startswith('linux') and os.environ.get('DISPLAY'):
+        return 'x11'
+    return 'none'
+
+
+def load_backend(name='auto', **options):
+    """导入并创建后端
+
+    Args:
+        name: 'auto'、'none' 或 BACKENDS 中的名称
+        options: 传给后端构造函数的参数
+    """
+    if name == 'auto':
+        name = detect()
+    if name == 'none':
+        return HeadlessBackend()
+    if name not in BACKENDS:
+        raise ValueError(f"未知的平台后端: {name}")
+    module_name, class_name = BACKENDS[name]
+    module = importlib.import_module(module_name)
+    return getattr(module, class_name)(**options)
@@ -0,0 +1,92 @@
+"""进程信息缓存
+
+以 (pid, create_time) 为键缓存进程名称、显示名称、格式化的启动时间和可执行文件路径。
+每次查询只需要读取进程的启动时间（打开进程句柄，开销很小）来确认 PID 没有被复用，
+名称和路径只在第一次遇到这个进程时解析一次。PID 被复用时启动时间不同，会重新解析；
+进程退出后由 retain() 从缓存中移除。命中/未命中次数可以通过 stats() 查看。
+"""
+import collections
+import datetime
+import threading
+
+import psutil
+
+# 缓存的进程信息，start_time 为 "%Y-%m-%d %H:%M:%S" 格式的启动时间
+ProcessInfo = collections.namedtuple(
+    'ProcessInfo', 'pid create_time process_name display_name exe start_time')
+
+
+class ProcessCache:
+    """进程信息缓存（线程安全）
+
+    Args:
+        source: 提供 create_time(pid) 和 process_details(pid) 的进程信息来源（见 platforms.PlatformBackend）
+        display_name: 进程名称 → 显示名称的函数，默认使用进程名称本身
+    """
+
+    def __init__(self, source, display_name=None):
+        self.source = source
+        self._display_name = display_name or (lambda process_name: process_name)
+        self._entries = {}  # pid → ProcessInfo
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, pid):
+        """获取进程信息，进程不存在或无权访问时抛出 psutil 异常"""
+        try:
+            create_time = self.source.create_time(pid)
+            with self._lock:
+                info = self._entries.get(pid)
+                if info is not None and info.create_time == create_time:
+                    self.hits += 1
+                    return info
+            process_name, exe = self.source.process_details(pid)
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            with self._lock:
+                if self._entries.pop(pid, None) is not None:
+                    self.evictions += 1
+            raise
+
+        info = ProcessInfo(
+            pid, create_time, process_name, self._display_name(process_name), exe,
+            datetime.datetime.fromtimestamp(create_time).strftime("%Y-%m-%d %H:%M:%S")
+        )
+        with self._lock:
+            self.misses += 1
+            if pid in self._entries:
+                self.evictions += 1  # PID 已被新进程复用
+            self._entries[pid] = info
+        return info
+
+    def process_name(self, pid):
+        """获取进程名称（可以作为 ForegroundTracker 的 resolve_process_name）"""
+        return self.lookup(pid).process_name
+
+    def retain(self, pids):
+        """只保留 pids 中的进程，其余视为已退出并移除"""
+        with self._lock:
+            gone = [pid for pid in self._entries if pid not in pids]
+            for pid in gone:
+                del self._entries[pid]
+            self.evictions += len(gone)
+
+    def set_display_name(self, display_name):
+        """更换显示名称函数（自定义名称变化后调用），并更新已缓存的显示名称"""
+        with self._lock:
+            self._display_name = display_name
+            for pid, info in self._entries.items():
+                self._entries[pid] = info._replace(display_name=display_name(info.process_name))
+
+    def stats(self):
+        """缓存大小和命中统计"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None
+            }
@@ -0,0 +1,151 @@
+"""采样线程的栈采样分析
+
+在单独的线程中按固定间隔读取目标线程的调用栈（sys._current_frames），持续指定的秒数，
+结束后在数据库文件所在的目录写入两个文件：
+
+- profile-YYYYmmdd-HHMMSS.folded: 折叠栈格式（每行 "外层;...;内层 样本数"），
+  可以直接交给 flamegraph.pl、speedscope 等工具生成火焰图
+- profile-YYYYmmdd-HHMMSS.txt: 每个函数的自身耗时和累计耗时（按自身耗时排序）
+
+只有分析期间才存在采样线程，被分析的代码本身不做任何改动，不分析时没有开销。
+"""
+import collections
+import datetime
+import os
+import sys
+import threading
+import time
+
+
+def frame_label(code):
+    """栈帧在折叠栈中的名称：函数名 (文件名:行号)，不能包含分号"""
+    label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return label.replace(';', ':')
+
+
+class SamplingProfiler:
+    """对一个线程做栈采样
+
+    Args:
+        thread_name: 被分析线程的名称（threading.Thread 的 name）
+        seconds: 分析持续的秒数
+        interval: 采样间隔（秒）
+        output_dir: 结果文件的目录
+    """
+
+    def __init__(self, thread_name, seconds, interval, output_dir):
+        self.thread_name = thread_name
+        self.seconds = seconds
+        self.interval = interval
+        self.output_dir = output_dir
+        self.stacks = collections.Counter()  # 折叠栈 → 样本数
+        self.self_time = collections.Counter()  # 函数 → 位于栈顶的秒数
+        self.total_time = collections.Counter()  # 函数 → 位于栈中的秒数
+        self.samples = 0
+        self.started_at = None
+        self.finished_at = None
+        self.output = None
+        self.error = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()  # 保护统计结果，分析期间可以查询进度
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """在后台线程中开始采样"""
+        self.started_at = datetime.datetime.now()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """提前结束采样（仍然写入结果）"""
+        self._stopped.set()
+
+    def _target_ident(self):
+        for thread in threading.enumerate():
+            if thread.name == self.thread_name:
+                return thread.ident
+        return None
+
+    def _run(self):
+        try:
+            deadline = time.perf_counter() + self.seconds
+            previous = time.perf_counter()
+            ident = None
+            while not self._stopped.is_set():
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                if ident is None:
+                    ident = self._target_ident()
+                frame = sys._current_frames().get(ident) if ident is not None else None
+                if frame is not None:
+                    self._record(frame, now - previous)
+                else:
+                    ident = None  # 线程还没有启动或已经退出
+                previous = now
+                self._stopped.wait(self.interval)
+            self.output = self._write()
+        except Exception as e:
+            self.error = str(e)
+            print(f"性能分析失败: {e}")
+        finally:
+            self.finished_at = datetime.datetime.now()
+
+    def _record(self, frame, elapsed):
+        """记录一个样本，elapsed 为距离上一个样本的实际时间"""
+        labels = []
+        while frame is not None:
+            labels.append(frame_label(frame.f_code))
+            frame = frame.f_back
+        labels.reverse()
+        with self._lock:
+            self.samples += 1
+            self.stacks[';'.join(labels)] += 1
+            self.self_time[labels[-1]] += elapsed
+            for label in set(labels):  # 递归调用只计一次
+                self.total_time[label] += elapsed
+
+    def _write(self):
+        """写入折叠栈和函数耗时表，返回两个文件的路径"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"profile-{self.started_at.strftime('%Y%m%d-%H%M%S')}")
+        folded = base + '.folded'
+        with open(folded, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        table = base + '.txt'
+        with open(table, 'w', encoding='utf-8') as f:
+            f.write(f"# 线程 {self.thread_name}，{self.samples} 个样本，间隔 {self.interval * 1000:g} ms\n")
+            f.write("self_ms\ttotal_ms\tfunction\n")
+            for label, _ in self.self_time.most_common():
+                f.write(f"{self.self_time[label] * 1000:.1f}\t{self.total_time[label] * 1000:.1f}\t{label}\n")
+            for label in self.total_time:
+                if label not in self.self_time:
+                    f.write(f"0.0\t{self.total_time[label] * 1000:.1f}\t{label}\n")
+        print(f"性能分析结果已写入 {folded}")
+        return {'folded': folded, 'functions': table}
+
+    def top_functions(self, limit=10):
+        """自身耗时最多的函数"""
+        with self._lock:
+            return [{'function': label, 'self_ms': round(seconds * 1000, 1),
+                     'total_ms': round(self.total_time[label] * 1000, 1)}
+                    for label, seconds in self.self_time.most_common(limit)]
+
+    def to_dict(self):
+        return {
+            'thread': self.thread_name,
+            'running': self.running,
+            'seconds': self.seconds,
+            'interval': self.interval,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'samples': self.samples,
+            'output': self.output,
+            'error': self.error,
+            'top_functions': self.top_functions(),
+        }
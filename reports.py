@@ -0,0 +1,53 @@
+"""使用时间统计
+
+直接在 SQL 中根据 focus_intervals 计算每个应用的前台时间，
+不需要把整段历史读到 Python 中逐行计算。
+时间使用与数据库相同的 ISO 格式字符串（本地时间）。
+"""
+import datetime
+
+
+def _seconds_expr(start_column, end_column):
+    """区间与 [:from, :to) 的重叠秒数，未结束的区间按 :now 计算"""
+    return (f"(julianday(MIN(IFNULL({end_column}, :now), :to)) - "
+            f"julianday(MAX({start_column}, :from))) * 86400")
+
+
+def focused_seconds_by_app(conn, start, end, now=None):
+    """统计时间范围内每个应用的前台时间
+
+    Args:
+        conn: 数据库连接
+        start, end: 时间范围（datetime），只统计与该范围重叠的部分
+        now: 未结束区间的截止时间，默认为当前时间
+
+    Returns:
+        list: [(process_name, seconds), ...]，按前台时间从多到少排列
+    """
+    now = now or datetime.datetime.now()
+    params = {'from': start.isoformat(), 'to': end.isoformat(), 'now': now.isoformat()}
+    rows = conn.execute(f"""
+        SELECT p.name, SUM({_seconds_expr('f.start_time', 'f.end_time')}) AS seconds
+        FROM focus_intervals f
+        JOIN processes p ON p.id = f.process_id
+        WHERE f.start_time < :to
+        AND IFNULL(f.end_time, :now) > :from
+        GROUP BY f.process_id
+        ORDER BY seconds DESC
+    """, params).fetchall()
+    return [(row[0], row[1]) for row in rows]
+
+
+def focused_seconds(conn, process_name, start, end, now=None):
+    """统计时间范围内单个应用的前台时间（秒）"""
+    now = now or datetime.datetime.now()
+    params = {'from': start.isoformat(), 'to': end.isoformat(), 'now': now.isoformat(),
+              'process_name': process_name}
+    row = conn.execute(f"""
+        SELECT SUM({_seconds_expr('f.start_time', 'f.end_time')})
+        FROM focus_intervals f
+        WHERE f.process_id = (SELECT id FROM processes WHERE name = :process_name)
+        AND f.start_time < :to
+        AND IFNULL(f.end_time, :now) > :from
+    """, params).fetchone()
+    return row[0] or 0.0
@@ -0,0 +1,237 @@
+"""分批删除与增量回收空间
+
+大量删除如果放在一个事务中，会长时间持有写锁，采样线程和控制面板都要等待。
+这里把删除拆成每批 config.CLEANUP_BATCH_SIZE 行的短事务：先在读事务中按主键顺序
+找出一批要删除的行，再用一个短的写事务按主键删除，批与批之间暂停一下，让出写锁。
+
+数据库使用 auto_vacuum=INCREMENTAL，删除后通过 incremental_vacuum 分步把空闲页
+归还给文件系统。每次清理的进度和耗时记录在 CleanupProgress 中。
+"""
+import collections
+import datetime
+import threading
+import time
+
+import config
+
+# 各表的主键列，按主键顺序分批删除（usage_hourly / usage_daily 是 WITHOUT ROWID 表）
+TABLE_KEYS = {
+    'app_usage': ('id',),
+    'focus_intervals': ('id',),
+    'usage_hourly': ('day', 'hour', 'process_id'),
+    'usage_daily': ('day', 'process_id'),
+    'titles': ('id',),
+}
+
+
+class CleanupRun:
+    """一次清理任务的进度和耗时"""
+
+    def __init__(self, task):
+        self.task = task
+        self.started_at = datetime.datetime.now()
+        self.finished_at = None
+        self.deleted = collections.Counter()  # 每张表已删除的行数
+        self.batches = 0
+        self.delete_ms = 0.0       # 所有删除事务的总耗时
+        self.max_batch_ms = 0.0    # 单个删除事务的最长耗时（即最长的写锁占用时间）
+        self.vacuumed_pages = 0
+        self.vacuum_ms = 0.0
+
+    def record_batch(self, table, rows, elapsed_ms):
+        self.deleted[table] += rows
+        self.batches += 1
+        self.delete_ms += elapsed_ms
+        self.max_batch_ms = max(self.max_batch_ms, elapsed_ms)
+
+    def record_vacuum(self, pages, elapsed_ms):
+        self.vacuumed_pages += pages
+        self.vacuum_ms += elapsed_ms
+
+    def to_dict(self):
+        finished_at = self.finished_at or datetime.datetime.now()
+        return {
+            'task': self.task,
+            'running': self.finished_at is None,
+            'started_at': self.started_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'elapsed_ms': round((finished_at - self.started_at).total_seconds() * 1000, 1),
+            'deleted': dict(self.deleted),
+            'batches': self.batches,
+            'delete_ms': round(self.delete_ms, 1),
+            'max_batch_ms': round(self.max_batch_ms, 1),
+            'vacuumed_pages': self.vacuumed_pages,
+            'vacuum_ms': round(self.vacuum_ms, 1),
+        }
+
+
+class CleanupProgress:
+    """记录正在运行和最近完成的清理任务（线程安全）
+
+    Args:
+        history_size: 保留的已完成任务数
+    """
+
+    def __init__(self, history_size=10):
+        self._lock = threading.Lock()
+        self._running = []
+        self._finished = collections.deque(maxlen=history_size)
+
+    def start(self, task):
+        """开始一个清理任务，返回用于记录进度的 CleanupRun"""
+        run = CleanupRun(task)
+        with self._lock:
+            self._running.append(run)
+        return run
+
+    def finish(self, run):
+        run.finished_at = datetime.datetime.now()
+        with self._lock:
+            self._running.remove(run)
+            self._finished.append(run)
+
+    def snapshot(self):
+        """返回 {'running': [...], 'recent': [...]}，recent 从新到旧排列"""
+        with self._lock:
+            running = [run.to_dict() for run in self._running]
+            recent = [run.to_dict() for run in reversed(self._finished)]
+        return {'running': running, 'recent': recent}
+
+
+def _pause():
+    if config.CLEANUP_BATCH_PAUSE > 0:
+        time.sleep(config.CLEANUP_BATCH_PAUSE)
+
+
+def delete_keys(conn, table, keys, run=None, pause=True):
+    """按主键分批删除指定的行
+
+    Args:
+        keys: 主键值的列表，每个元素是与 TABLE_KEYS[table] 对应的元组
+        pause: 批与批之间是否暂停（在采样线程中执行时暂停只会拖慢采样本身）
+
+    Returns:
+        int: 删除的行数
+    """
+    key_columns = TABLE_KEYS[table]
+    match = ' AND '.join(f"{column} = ?" for column in key_columns)
+    batch_size = max(int(config.CLEANUP_BATCH_SIZE), 1)
+    deleted = 0
+    for offset in range(0, len(keys), batch_size):
+        if offset and pause:
+            _pause()
+        batch = [tuple(key) for key in keys[offset:offset + batch_size]]
+        started = time.perf_counter()
+        with conn:
+            conn.executemany(f"DELETE FROM {table} WHERE {match}", batch)
+        if run is not None:
+            run.record_batch(table, len(batch), (time.perf_counter() - started) * 1000)
+        deleted += len(batch)
+    return deleted
+
+
+def delete_where(conn, table, condition, params=(), run=None):
+    """分批删除满足条件的行
+
+    按主键顺序读取下一批要删除的主键（读事务不阻塞写入），再用一个短事务删除。
+    每批从上一批的最后一个主键之后继续查找，整张表最多扫描一遍
+
+    Args:
+        condition: WHERE 条件（SQL 片段）
+        params: 条件中的参数
+
+    Returns:
+        int: 删除的行数
+    """
+    key_columns = TABLE_KEYS[table]
+    keys = ', '.join(key_columns)
+    placeholders = ', '.join('?' * len(key_columns))
+    batch_size = max(int(config.CLEANUP_BATCH_SIZE), 1)
+    deleted = 0
+    last = None
+    while True:
+        where = f"({condition})"
+        args = list(params)
+        if last is not None:
+            where += f" AND ({keys}) > ({placeholders})"
+            args.extend(last)
+        batch = conn.execute(f"""
+            SELECT {keys} FROM {table}
+            WHERE {where}
+            ORDER BY {keys}
+            LIMIT ?
+        """, args + [batch_size]).fetchall()
+        if not batch:
+            break
+        if last is not None:
+            _pause()
+        deleted += delete_keys(conn, table, batch, run)
+        if len(batch) < batch_size:
+            break
+        last = tuple(batch[-1])
+    return deleted
+
+
+def prune_titles(conn, run=None):
+    """分批删除没有被 app_usage 或 focus_intervals 引用的窗口标题
+
+    一次扫描找出所有未被引用的标题，再按主键分批删除。只能在唯一写入标题引用的线程
+    （采样线程）中执行，并在之后清空它的标题缓存，否则缓存中的 ID 会指向已删除的标题。
+    批与批之间不暂停，每批仍是单独的短事务，其他连接可以在批之间写入
+
+    Returns:
+        int: 删除的标题数
+    """
+    keys = conn.execute('''
+        SELECT id FROM titles
+        WHERE id NOT IN (SELECT title_id FROM app_usage UNION SELECT title_id FROM focus_intervals)
+        ORDER BY id
+    ''').fetchall()
+    return delete_keys(conn, 'titles', keys, run, pause=False)
+
+
+def enable_incremental_vacuum(conn):
+    """把数据库切换到 auto_vacuum=INCREMENTAL（启动时执行一次）
+
+    新建的数据库直接生效；已有数据库需要执行一次 VACUUM 重建文件，
+    数据库较大时可能需要一些时间
+
+    Returns:
+        bool: 是否执行了 VACUUM
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return False
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return False
+    print("正在整理数据库文件以启用增量空间回收...")
+    conn.execute("VACUUM")
+    return True
+
+
+def incremental_vacuum(conn, run=None):
+    """分步回收空闲页，每步最多 config.VACUUM_PAGES_PER_STEP 页
+
+    Returns:
+        int: 回收的页数
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return 0
+    step = max(int(config.VACUUM_PAGES_PER_STEP), 1)
+    freed = 0
+    while True:
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if not free_pages:
+            break
+        if freed:
+            _pause()
+        started = time.perf_counter()
+        # execute() 只执行一步（只回收一页），executescript() 会执行到结束
+        conn.executescript(f"PRAGMA incremental_vacuum({min(free_pages, step)})")
+        remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if run is not None:
+            run.record_vacuum(free_pages - remaining, (time.perf_counter() - started) * 1000)
+        if remaining >= free_pages:
+            break
+        freed += free_pages - remaining
+    return freed
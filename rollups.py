@@ -0,0 +1,154 @@
+"""按小时/天预聚合的使用时间
+
+usage_hourly 和 usage_daily 按 (时间段, 进程) 保存累计的打开时间和前台时间。
+会话结束或前台区间结束时由写入器增量更新，统计接口只读取这两张表，
+不需要扫描原始记录。
+
+已有数据可以用下面的命令重新生成（只能覆盖数据库中仍保留的原始记录，
+已经按保留期限清理掉的部分会从聚合表中消失）：
+
+    python rollups.py rebuild
+"""
+import datetime
+import sys
+
+_UPSERT_HOURLY = '''
+    INSERT INTO usage_hourly (day, hour, process_id, open_seconds, focused_seconds)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (day, hour, process_id) DO UPDATE SET
+        open_seconds = open_seconds + excluded.open_seconds,
+        focused_seconds = focused_seconds + excluded.focused_seconds
+'''
+
+_UPSERT_DAILY = '''
+    INSERT INTO usage_daily (day, process_id, open_seconds, focused_seconds)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (day, process_id) DO UPDATE SET
+        open_seconds = open_seconds + excluded.open_seconds,
+        focused_seconds = focused_seconds + excluded.focused_seconds
+'''
+
+
+def split_by_hour(start, end):
+    """把时间区间按整点拆分
+
+    Yields:
+        (day, hour, seconds)，day 为 YYYY-MM-DD 格式的字符串
+    """
+    current = start
+    while current < end:
+        next_hour = current.replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=1)
+        piece_end = min(next_hour, end)
+        yield current.date().isoformat(), current.hour, (piece_end - current).total_seconds()
+        current = piece_end
+
+
+def _accumulate(buckets, process_id, start, end, column):
+    """把一个区间累加到 {(day, hour, process_id): [open_seconds, focused_seconds]}"""
+    index = 0 if column == 'open' else 1
+    for day, hour, seconds in split_by_hour(start, end):
+        bucket = buckets.setdefault((day, hour, process_id), [0.0, 0.0])
+        bucket[index] += seconds
+
+
+def _write_buckets(conn, buckets):
+    """把累加结果写入小时表和天表"""
+    daily = {}
+    hourly_rows = []
+    for (day, hour, process_id), (open_seconds, focused_seconds) in buckets.items():
+        hourly_rows.append((day, hour, process_id, open_seconds, focused_seconds))
+        bucket = daily.setdefault((day, process_id), [0.0, 0.0])
+        bucket[0] += open_seconds
+        bucket[1] += focused_seconds
+    conn.executemany(_UPSERT_HOURLY, hourly_rows)
+    conn.executemany(_UPSERT_DAILY, [(day, process_id, o, f) for (day, process_id), (o, f) in daily.items()])
+
+
+def add_intervals(conn, open_intervals=(), focus_intervals=()):
+    """增量累加已结束的区间（在调用方的事务中执行）
+
+    Args:
+        open_intervals: [(process_id, start, end), ...] 已结束会话的打开时间
+        focus_intervals: [(process_id, start, end), ...] 已结束的前台区间
+    """
+    buckets = {}
+    for process_id, start, end in open_intervals:
+        _accumulate(buckets, process_id, start, end, 'open')
+    for process_id, start, end in focus_intervals:
+        _accumulate(buckets, process_id, start, end, 'focus')
+    if buckets:
+        _write_buckets(conn, buckets)
+
+
+def rebuild(conn):
+    """根据 app_usage 和 focus_intervals 中已结束的记录重新生成聚合表
+
+    在调用方的事务中执行，由调用方提交
+
+    Returns:
+        int: 处理的原始记录数
+    """
+    buckets = {}
+    count = 0
+    for table, column in (('app_usage', 'open'), ('focus_intervals', 'focus')):
+        cursor = conn.execute(f"SELECT process_id, start_time, end_time FROM {table} WHERE end_time IS NOT NULL")
+        for process_id, start_time, end_time in cursor:
+            _accumulate(buckets, process_id, datetime.datetime.fromisoformat(start_time),
+                        datetime.datetime.fromisoformat(end_time), column)
+            count += 1
+
+    conn.execute("DELETE FROM usage_hourly")
+    conn.execute("DELETE FROM usage_daily")
+    _write_buckets(conn, buckets)
+    return count
+
+
+def query_summary(conn, start, end, granularity='day'):
+    """读取聚合表
+
+    Args:
+        start, end: 时间范围（datetime，包含两端所在的小时/天）
+        granularity: 'hour' 或 'day'
+
+    Returns:
+        list: [(period, process_name, open_seconds, focused_seconds), ...]，
+        period 为 YYYY-MM-DD 或 YYYY-MM-DDTHH:00
+    """
+    if granularity == 'hour':
+        rows = conn.execute('''
+            SELECT r.day || 'T' || printf('%02d', r.hour) || ':00', p.name, r.open_seconds, r.focused_seconds
+            FROM usage_hourly r
+            JOIN processes p ON p.id = r.process_id
+            WHERE (r.day > :from_day OR (r.day = :from_day AND r.hour >= :from_hour))
+            AND (r.day < :to_day OR (r.day = :to_day AND r.hour <= :to_hour))
+            ORDER BY r.day, r.hour, r.focused_seconds DESC
+        ''', {'from_day': start.date().isoformat(), 'from_hour': start.hour,
+              'to_day': end.date().isoformat(), 'to_hour': end.hour}).fetchall()
+    elif granularity == 'day':
+        rows = conn.execute('''
+            SELECT r.day, p.name, r.open_seconds, r.focused_seconds
+            FROM usage_daily r
+            JOIN processes p ON p.id = r.process_id
+            WHERE r.day BETWEEN ? AND ?
+            ORDER BY r.day, r.focused_seconds DESC
+        ''', (start.date().isoformat(), end.date().isoformat())).fetchall()
+    else:
+        raise ValueError(f"不支持的统计粒度: {granularity}")
+    return [tuple(row) for row in rows]
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['rebuild']:
+        print("用法: python rollups.py rebuild")
+        sys.exit(1)
+
+    import database
+    import migrations
+
+    conn = database.connect()
+    migrations.migrate(conn)
+    print("正在重新生成使用时间聚合表...")
+    with conn:
+        count = rebuild(conn)
+    conn.close()
+    print(f"完成，共处理 {count} 条记录")
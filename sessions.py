@@ -0,0 +1,40 @@
+"""内存中的未结束会话表
+
+记录当前处于打开状态的 (process_name, window_title) 会话。启动时从数据库
+读取一次 end_time IS NULL 的记录重建状态，之后每次采样只需要一次集合差运算
+就能得到新打开和已关闭的会话，只把变化写入数据库。其他连接修改数据库后
+（例如控制面板清空数据库）重新读取。
+"""
+
+
+class OpenSessionTable:
+    """未结束会话表"""
+
+    def __init__(self):
+        self.sessions = set()
+        self.loaded = False
+
+    def load(self, conn):
+        """从数据库重建未结束会话（启动时和其他连接修改数据库后调用）"""
+        cur = conn.cursor()
+        cur.execute("SELECT process_name, window_title FROM usage_view WHERE end_time IS NULL")
+        self.sessions = set((row[0], row[1]) for row in cur.fetchall())
+        self.loaded = True
+
+    def diff(self, current):
+        """计算与当前快照的差异
+
+        Args:
+            current: 当前快照中的 (process_name, window_title) 集合
+
+        Returns:
+            tuple: (opened, closed)，分别是新打开和已关闭的会话集合
+        """
+        opened = current - self.sessions
+        closed = self.sessions - current
+        return opened, closed
+
+    def apply(self, opened, closed):
+        """在变化写入数据库后更新内存状态"""
+        self.sessions -= closed
+        self.sessions |= opened
@@ -0,0 +1,103 @@
+"""设置缓存与名称映射
+
+只有当 settings.json 的修改时间或大小变化时才重新读取和解析文件，
+其余调用直接返回内存中的只读设置。列表类设置会转换为 frozenset，
+便于做 O(1) 的成员判断。NameRegistry 随设置一起重建，提供进程名称和
+显示名称之间的双向查找。
+"""
+import json
+import os
+import threading
+from types import MappingProxyType
+
+# 转换为 frozenset 的设置项
+SET_KEYS = ('ignored_apps', 'hidden_from_web', 'ignore_title_changes')
+
+
+class SettingsCache:
+    """基于文件修改时间的设置缓存
+
+    Args:
+        path: 设置文件路径
+        defaults: 默认设置，文件中的设置会覆盖这些值
+        on_reload: 设置重新加载后调用 on_reload(old, new)，首次加载时 old 为 None
+    """
+
+    def __init__(self, path, defaults, on_reload=None):
+        self.path = path
+        self.defaults = defaults
+        self.on_reload = on_reload
+        self.version = 0  # 每次重新加载后递增，可用来判断派生数据是否需要重建
+        self._lock = threading.Lock()
+        self._key = None
+        self._settings = None
+
+    def _file_key(self):
+        """返回 (修改时间, 大小)，文件不存在时返回 None"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def get(self):
+        """获取当前设置（只读映射）"""
+        key = self._file_key()
+        settings = self._settings
+        if settings is not None and key == self._key:
+            return settings
+
+        with self._lock:
+            if self._settings is None or key != self._key:
+                self._reload(key)
+            return self._settings
+
+    def _reload(self, key):
+        settings = dict(self.defaults)
+        if key is not None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    settings.update(json.load(f))
+            except Exception as e:
+                print(f"加载配置文件失败: {e}")
+                self._key = key
+                # 保留上一次成功加载的设置，文件再次变化时重试
+                if self._settings is not None:
+                    return
+                settings = dict(self.defaults)
+
+        for name in SET_KEYS:
+            settings[name] = frozenset(settings.get(name) or ())
+
+        old = self._settings
+        self._settings = MappingProxyType(settings)
+        self._key = key
+        self.version += 1
+        if self.on_reload:
+            self.on_reload(old, self._settings)
+
+
+class NameRegistry:
+    """进程名称与显示名称的双向映射
+
+    合并内置的显示名称（config.APP_DISPLAY_NAMES）和用户的自定义名称，
+    自定义名称优先。多个进程对应同一个显示名称时，反向查找优先返回
+    自定义名称对应的进程，其次是内置映射中的第一个进程。
+    """
+
+    def __init__(self, builtin_names, custom_names):
+        self._display = dict(builtin_names)
+        self._display.update(custom_names)
+        self._process = {}
+        for process_name, display_name in builtin_names.items():
+            self._process.setdefault(display_name, process_name)
+        for process_name, display_name in custom_names.items():
+            self._process[display_name] = process_name
+
+    def display_name(self, process_name):
+        """进程名称 → 显示名称，没有映射时返回进程名称本身"""
+        return self._display.get(process_name, process_name)
+
+    def process_name(self, display_name):
+        """显示名称 → 进程名称，没有映射时返回显示名称本身"""
+        return self._process.get(display_name, display_name)
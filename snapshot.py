@@ -0,0 +1,67 @@
+"""窗口/进程快照引擎
+
+一次枚举所有顶层窗口并按 PID 分组，只为真正拥有可见、带标题窗口的进程
+解析进程信息（名称、启动时间）。进程信息通过 ProcessCache 缓存，每个进程
+只在第一次出现时解析一次。窗口和进程信息来自平台后端（见 platforms.py），
+可以用合成数据后端对分组逻辑做基准测试。
+"""
+import psutil
+
+from process_cache import ProcessCache
+
+
+class SnapshotEngine:
+    """单次遍历的快照引擎
+
+    Args:
+        source: 平台后端，提供 enum_windows()、create_time(pid) 和 process_details(pid)
+        cache: 进程信息缓存，默认为 source 创建一个新的 ProcessCache
+    """
+
+    def __init__(self, source, cache=None):
+        self.source = source
+        self.cache = cache or ProcessCache(source)
+
+    def group_windows(self):
+        """枚举一次窗口，按 PID 分组窗口标题（保持枚举顺序）"""
+        windows_by_pid = {}
+        for pid, window_title in self.source.enum_windows():
+            titles = windows_by_pid.get(pid)
+            if titles is None:
+                windows_by_pid[pid] = [window_title]
+            else:
+                titles.append(window_title)
+        return windows_by_pid
+
+    def take(self):
+        """获取一次快照
+
+        返回一个列表，每个元素包含：
+        - pid: 进程 ID
+        - process_name: 原始进程名称
+        - display_name: 显示名称
+        - create_time: 进程启动时间戳
+        - process_start_time: 格式化的进程启动时间
+        - exe: 可执行文件路径，无法获取时为 None
+        - window_titles: 该进程所有可见窗口的标题
+
+        已经没有窗口的进程会从进程信息缓存中移除
+        """
+        windows_by_pid = self.group_windows()
+        snapshot = []
+        for pid, window_titles in windows_by_pid.items():
+            try:
+                info = self.cache.lookup(pid)
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+            snapshot.append({
+                "pid": pid,
+                "process_name": info.process_name,
+                "display_name": info.display_name,
+                "create_time": info.create_time,
+                "process_start_time": info.start_time,
+                "exe": info.exe,
+                "window_titles": window_titles
+            })
+        self.cache.retain(windows_by_pid)
+        return snapshot
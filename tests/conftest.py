@@ -0,0 +1,11 @@
+"""测试配置：模块都在仓库根目录，直接加入导入路径"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+# 导入 app 时会在后台访问数据库，测试不能使用仓库目录中的数据库文件
+database.DATABASE = os.path.join(tempfile.mkdtemp(prefix='app-usage-tests-'), 'app_usage.db')
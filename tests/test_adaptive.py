@@ -0,0 +1,50 @@
+"""AdaptiveInterval：退避、空闲和锁屏状态"""
+from adaptive import AdaptiveInterval
+
+
+def make_pacing(**kwargs):
+    options = dict(min_interval=1.0, max_interval=8.0, locked_interval=30.0, idle_threshold=60.0, backoff=2.0)
+    options.update(kwargs)
+    return AdaptiveInterval(**options)
+
+
+def test_backs_off_to_max_without_changes():
+    pacing = make_pacing()
+    assert [pacing.next(False) for _ in range(5)] == [2.0, 4.0, 8.0, 8.0, 8.0]
+    assert pacing.state == 'active'
+
+
+def test_change_resets_to_min():
+    pacing = make_pacing()
+    pacing.next(False)
+    pacing.next(False)
+    assert pacing.next(True) == 1.0
+    assert pacing.next(False) == 2.0
+
+
+def test_idle_keeps_backing_off_on_changes():
+    pacing = make_pacing()
+    assert pacing.next(True, idle_seconds=120) == 2.0
+    assert pacing.state == 'idle'
+    assert pacing.next(True, idle_seconds=120) == 4.0
+    assert pacing.next(True, idle_seconds=5) == 1.0
+    assert pacing.state == 'active'
+
+
+def test_locked_uses_locked_interval():
+    pacing = make_pacing()
+    assert pacing.next(True, locked=True) == 30.0
+    assert pacing.state == 'locked'
+    assert pacing.next(True) == 1.0
+    assert pacing.state == 'active'
+
+
+def test_locked_interval_not_shorter_than_max():
+    pacing = make_pacing(max_interval=60.0)
+    assert pacing.next(False, locked=True) == 60.0
+
+
+def test_max_below_min_uses_min():
+    pacing = make_pacing(min_interval=5.0, max_interval=2.0)
+    assert pacing.next(False) == 5.0
+    assert pacing.next(True) == 5.0
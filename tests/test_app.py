@@ -0,0 +1,237 @@
+"""app 中的焦点切换处理和键集分页"""
+import collections
+import datetime
+import time
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+import app
+import database
+import migrations
+from coalescing import SessionDebouncer, TitleNormalizer
+from foreground import FOREGROUND, ForegroundEvent, ForegroundTracker, ReplayEventSource
+from sessions import OpenSessionTable
+from writer import BatchWriter
+
+
+class RecordingWriter:
+    """只记录焦点切换的写入器"""
+
+    def __init__(self):
+        self.focus_changes = []
+
+    def focus(self, process_name, window_title, switch_time):
+        self.focus_changes.append((process_name, window_title, switch_time.timestamp()))
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    # 从默认设置构造，不读取 settings.json（第一次加载会在后台清除被隐藏应用的数据）
+    settings = dict(app.settings_cache.defaults, monitoring_enabled=True, ignored_apps=[], hidden_from_web=[],
+                    ignore_title_changes=[], title_flap_seconds=1.0)
+    monkeypatch.setattr(app, 'load_config', lambda: settings)
+    monkeypatch.setattr(app, 'get_title_normalizer', lambda: TitleNormalizer({}))
+    return settings
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    writer = RecordingWriter()
+    monkeypatch.setattr(app, 'batch_writer', writer)
+    monkeypatch.setattr(app, 'focus_changes', collections.deque())
+    monkeypatch.setattr(app, '_last_focus', None)
+    return writer
+
+
+def focus(process_name, window_title, since, hwnd=1):
+    return {'hwnd': hwnd, 'pid': 100, 'process_name': process_name, 'window_title': window_title, 'since': since}
+
+
+def test_title_flaps_within_app_are_skipped(settings, writer):
+    app.focus_changes.extend([
+        focus('chrome.exe', 'Inbox', 100.0),
+        focus('chrome.exe', 'Loading...', 100.2),
+        focus('chrome.exe', 'Search', 100.4),
+        focus('code.exe', 'app.py', 110.0, hwnd=2),
+    ])
+    app.queue_focus_changes(settings)
+    assert writer.focus_changes == [
+        ('chrome.exe', 'Inbox', 100.0),
+        ('chrome.exe', 'Search', 100.4),
+        ('code.exe', 'app.py', 110.0),
+    ]
+    assert not app.focus_changes
+
+
+def test_switch_to_other_app_is_never_a_flap(settings, writer):
+    app.focus_changes.extend([
+        focus('chrome.exe', 'Inbox', 100.0),
+        focus('code.exe', 'app.py', 100.1, hwnd=2),
+        focus('chrome.exe', 'Inbox', 100.2),
+    ])
+    app.queue_focus_changes(settings)
+    assert [change[0] for change in writer.focus_changes] == ['chrome.exe', 'code.exe', 'chrome.exe']
+
+
+def test_recent_title_change_waits_for_next_sample(settings, writer):
+    now = float(int(time.time()))
+    app.focus_changes.extend([
+        focus('chrome.exe', 'Inbox', now - 10),
+        focus('chrome.exe', 'Search', now),
+    ])
+    app.queue_focus_changes(settings)
+    assert writer.focus_changes == [('chrome.exe', 'Inbox', now - 10)]
+    assert [change['window_title'] for change in app.focus_changes] == ['Search']
+
+
+def test_ignored_app_ends_interval(settings, writer):
+    settings['ignored_apps'] = ['secret.exe']
+    app.focus_changes.extend([
+        focus('chrome.exe', 'Inbox', 100.0),
+        focus('secret.exe', 'hidden', 105.0, hwnd=2),
+        focus(None, '', 106.0, hwnd=0),
+    ])
+    app.queue_focus_changes(settings)
+    assert writer.focus_changes == [('chrome.exe', 'Inbox', 100.0), (None, None, 105.0)]
+
+
+@pytest.fixture
+def collector(tmp_path, monkeypatch, settings):
+    """使用临时数据库的采样状态，前台窗口为 chrome.exe 的 Inbox"""
+    settings['title_min_dwell'] = 0
+    monkeypatch.setattr(database, 'DATABASE', str(tmp_path / 'app_usage.db'))
+    monkeypatch.setattr(app, 'db_pool', database.ConnectionPool())
+    with app.db_pool.connection() as conn:
+        migrations.migrate(conn)
+    tracker = ForegroundTracker(ReplayEventSource([ForegroundEvent(100.0, FOREGROUND, 1, 100, 'Inbox')]),
+                                resolve_process_name=lambda pid: 'chrome.exe')
+    tracker.run()
+    monkeypatch.setattr(app, 'foreground_tracker', tracker)
+    monkeypatch.setattr(app, 'batch_writer', BatchWriter(database.connect))
+    monkeypatch.setattr(app, 'open_sessions', OpenSessionTable())
+    monkeypatch.setattr(app, 'session_debouncer', SessionDebouncer())
+    monkeypatch.setattr(app, 'focus_changes', collections.deque([tracker.current]))
+    monkeypatch.setattr(app, '_last_focus', None)
+    yield
+    app.batch_writer.reset()
+
+
+def count_open(conn):
+    return (conn.execute("SELECT COUNT(*) FROM app_usage WHERE end_time IS NULL").fetchone()[0],
+            conn.execute("SELECT COUNT(*) FROM focus_intervals WHERE end_time IS NULL").fetchone()[0])
+
+
+def test_resync_after_external_clear(collector):
+    running_apps = [{'raw_name': 'chrome.exe', 'window_titles': ['Inbox']}]
+    foreground_app = {'process_name': 'chrome.exe', 'window_title': 'Inbox', 'raw_name': 'chrome.exe'}
+    app.update_database(running_apps, foreground_app)
+    conn = database.connect()
+    try:
+        assert count_open(conn) == (1, 1)
+
+        # 另一个连接清空数据库（控制面板的“清空数据库”）
+        for table in ('app_usage', 'focus_intervals', 'usage_hourly', 'usage_daily'):
+            conn.execute(f"DELETE FROM {table}")
+        conn.commit()
+
+        before = time.time()
+        app.sync_external_changes()
+        assert app.open_sessions.sessions == set()
+        assert app._last_focus is None
+        assert [change['window_title'] for change in app.focus_changes] == ['Inbox']
+        assert app.focus_changes[0]['since'] >= before
+
+        app.update_database(running_apps, foreground_app)
+        assert count_open(conn) == (1, 1)
+        assert app.open_sessions.sessions == {('chrome.exe', 'Inbox')}
+    finally:
+        conn.close()
+
+
+def test_cursor_round_trip():
+    cursor = app.encode_cursor('2026-10-01T10:00:00.123456', 42)
+    assert app.decode_cursor(cursor) == ('2026-10-01T10:00:00.123456', 42)
+
+
+@pytest.mark.parametrize('cursor', ['', 'not base64!', 'MjAyNg=='])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        app.decode_cursor(cursor)
+
+
+@pytest.fixture
+def usage_db(tmp_path, monkeypatch, settings):
+    monkeypatch.setattr(database, 'DATABASE', str(tmp_path / 'app_usage.db'))
+    monkeypatch.setattr(app, 'db_pool', database.ConnectionPool())
+    with app.db_pool.connection() as conn:
+        migrations.migrate(conn)
+        conn.execute("INSERT INTO processes (id, name) VALUES (1, 'chrome.exe')")
+        conn.execute("INSERT INTO titles (id, title) VALUES (1, 'Inbox')")
+        start = datetime.datetime(2026, 10, 1, 10, 0, 0)
+        # 每两条记录的开始时间相同，游标必须同时比较 id
+        conn.executemany('''
+            INSERT INTO app_usage (id, process_id, title_id, start_time, end_time, is_foreground)
+            VALUES (?, 1, 1, ?, ?, 0)
+        ''', [(i, (start + datetime.timedelta(minutes=i // 2)).isoformat(),
+               (start + datetime.timedelta(minutes=i // 2 + 1)).isoformat()) for i in range(1, 8)])
+        conn.commit()
+    return list(range(7, 0, -1))
+
+
+def test_keyset_pages_cover_all_rows(usage_db):
+    pages = []
+    args = {'page_size': '3'}
+    while True:
+        rows, next_cursor, prev_cursor = app.fetch_usage_page(MultiDict(args))
+        pages.append([row['id'] for row in rows])
+        if next_cursor is None:
+            break
+        args = {'page_size': '3', 'after': next_cursor}
+    assert pages == [[7, 6, 5], [4, 3, 2], [1]]
+
+    rows, next_cursor, prev_cursor = app.fetch_usage_page(MultiDict({'page_size': '3', 'before': prev_cursor}))
+    assert [row['id'] for row in rows] == [4, 3, 2]
+    rows, next_cursor, prev_cursor = app.fetch_usage_page(MultiDict({'page_size': '3', 'before': prev_cursor}))
+    assert [row['id'] for row in rows] == [7, 6, 5]
+    assert prev_cursor is None
+
+
+def test_process_filter_uses_process_start_index(usage_db):
+    with app.db_pool.connection() as conn:
+        conn.execute("INSERT INTO processes (id, name) VALUES (2, 'notepad.exe')")
+        conn.execute('''
+            INSERT INTO app_usage (id, process_id, title_id, start_time, end_time, is_foreground)
+            VALUES (8, 2, 1, '2026-10-01T10:02:30', '2026-10-01T10:03:00', 0)
+        ''')
+        conn.commit()
+        plan = ' '.join(row[3] for row in conn.execute('''
+            EXPLAIN QUERY PLAN
+            SELECT id, process_name, window_title, start_time, end_time FROM usage_view
+            WHERE process_id IN (?) AND (start_time, id) < (?, ?)
+            ORDER BY start_time DESC, id DESC LIMIT ?
+        ''', (1, '2026-10-01T10:03:00', 7, 4)))
+    assert 'idx_app_usage_process_start' in plan
+    assert 'TEMP B-TREE' not in plan
+
+    rows, next_cursor, _ = app.fetch_usage_page(MultiDict({'process': 'chrome.exe', 'page_size': '3'}))
+    assert [row['id'] for row in rows] == [7, 6, 5]
+    rows, _, _ = app.fetch_usage_page(MultiDict({'process': 'chrome.exe', 'page_size': '3', 'after': next_cursor}))
+    assert [row['id'] for row in rows] == [4, 3, 2]
+    rows, _, _ = app.fetch_usage_page(MultiDict({'process': 'notepad.exe'}))
+    assert [row['id'] for row in rows] == [8]
+    assert app.fetch_usage_page(MultiDict({'process': 'missing.exe'})) == ([], None, None)
+
+
+def test_profile_only_starts_when_setting_changes(settings, monkeypatch):
+    started = []
+    monkeypatch.setattr(app, 'start_collector_profile', started.append)
+    monkeypatch.setattr(app, '_clean_hidden_apps_in_background', lambda hidden_apps: None)
+    old = dict(settings, profile_seconds=60)
+    app._on_settings_reload(None, old)
+    assert started == []
+    app._on_settings_reload(old, dict(old))
+    assert started == []
+    app._on_settings_reload(old, dict(old, profile_seconds=30))
+    app._on_settings_reload(dict(old, profile_seconds=30), dict(old, profile_seconds=0))
+    assert started == [30]
@@ -0,0 +1,71 @@
+"""SessionDebouncer 和 TitleNormalizer"""
+import datetime
+
+from coalescing import SessionDebouncer, TitleNormalizer
+
+T0 = datetime.datetime(2026, 10, 1, 10, 0, 0)
+KEY = ('chrome.exe', 'Inbox')
+
+
+def at(seconds):
+    return T0 + datetime.timedelta(seconds=seconds)
+
+
+def test_new_session_waits_for_min_dwell():
+    debouncer = SessionDebouncer()
+    assert debouncer.update({KEY}, set(), at(0), 5) == set()
+    assert debouncer.update({KEY}, set(), at(3), 5) == set()
+    assert debouncer.update({KEY}, set(), at(5), 5) == {KEY}
+    assert debouncer.started_at(KEY, at(5)) == at(0)
+
+
+def test_short_lived_title_is_dropped():
+    debouncer = SessionDebouncer()
+    debouncer.update({KEY}, set(), at(0), 5)
+    debouncer.update(set(), set(), at(2), 5)
+    assert debouncer.update({KEY}, set(), at(6), 5) == set()
+    assert debouncer.update({KEY}, set(), at(11), 5) == {KEY}
+    assert debouncer.started_at(KEY, at(11)) == at(6)
+
+
+def test_missing_session_stays_open_until_min_dwell():
+    debouncer = SessionDebouncer()
+    assert debouncer.update(set(), {KEY}, at(0), 5) == {KEY}
+    assert debouncer.update(set(), {KEY}, at(4), 5) == {KEY}
+    assert debouncer.update(set(), {KEY}, at(5), 5) == set()
+    assert debouncer.ended_at(KEY, at(5)) == at(0)
+
+
+def test_reappearing_session_keeps_record():
+    debouncer = SessionDebouncer()
+    debouncer.update(set(), {KEY}, at(0), 5)
+    assert debouncer.update({KEY}, {KEY}, at(2), 5) == {KEY}
+    assert debouncer.ended_at(KEY, at(10)) == at(10)
+
+
+def test_zero_dwell_is_immediate():
+    debouncer = SessionDebouncer()
+    assert debouncer.update({KEY}, set(), at(0), 0) == {KEY}
+    assert debouncer.update(set(), {KEY}, at(1), 0) == set()
+
+
+def test_forget_drops_pending_state():
+    debouncer = SessionDebouncer()
+    debouncer.update(set(), {KEY}, at(0), 5)
+    debouncer.forget([KEY])
+    assert debouncer.ended_at(KEY, at(9)) == at(9)
+
+
+def test_title_normalizer_rules():
+    normalizer = TitleNormalizer({
+        'chrome.exe': [[r' - Google Chrome$', '']],
+        '*': [[r'\(\d+\) ', '']],
+    })
+    assert normalizer.normalize('chrome.exe', '(3) Inbox - Google Chrome') == 'Inbox'
+    assert normalizer.normalize('code.exe', '(1) app.py') == 'app.py'
+    assert normalizer.normalize('code.exe', '') == ''
+
+
+def test_title_normalizer_keeps_title_when_rule_empties_it():
+    normalizer = TitleNormalizer({'*': [['.*', '']]})
+    assert normalizer.normalize('code.exe', 'app.py') == 'app.py'
@@ -0,0 +1,115 @@
+"""ForegroundTracker：用 ReplayEventSource 回放事件序列"""
+import psutil
+
+from foreground import FOREGROUND, TITLE, ForegroundEvent, ForegroundEventSource, ForegroundTracker, ReplayEventSource
+
+PROCESS_NAMES = {100: 'chrome.exe', 200: 'code.exe'}
+
+
+def resolve_process_name(pid):
+    try:
+        return PROCESS_NAMES[pid]
+    except KeyError:
+        raise psutil.NoSuchProcess(pid)
+
+
+def replay(events, resolve=resolve_process_name):
+    tracker = ForegroundTracker(ReplayEventSource(events), resolve_process_name=resolve)
+    changes = []
+    tracker.add_listener(lambda current, previous: changes.append((current, previous)))
+    tracker.run()
+    return tracker, changes
+
+
+def test_switches_and_title_changes():
+    tracker, changes = replay([
+        ForegroundEvent(1.0, FOREGROUND, 1, 100, 'Inbox'),
+        ForegroundEvent(2.0, TITLE, 1, 100, 'Search'),
+        ForegroundEvent(3.0, FOREGROUND, 2, 200, 'app.py'),
+        ForegroundEvent(4.0, FOREGROUND, 1, 100, 'Search'),
+    ])
+
+    assert [(c['process_name'], c['window_title'], c['since']) for c, _ in changes] == [
+        ('chrome.exe', 'Inbox', 1.0),
+        ('chrome.exe', 'Search', 2.0),
+        ('code.exe', 'app.py', 3.0),
+        ('chrome.exe', 'Search', 4.0),
+    ]
+    assert changes[0][1] is None
+    assert changes[2][1]['window_title'] == 'Search'
+    assert tracker.current == {'hwnd': 1, 'pid': 100, 'process_name': 'chrome.exe',
+                               'window_title': 'Search', 'since': 4.0}
+    assert list(tracker.switches) == [
+        (1.0, FOREGROUND, 'chrome.exe', 'Inbox'),
+        (2.0, TITLE, 'chrome.exe', 'Search'),
+        (3.0, FOREGROUND, 'code.exe', 'app.py'),
+        (4.0, FOREGROUND, 'chrome.exe', 'Search'),
+    ]
+
+
+def test_repeated_event_is_ignored():
+    tracker, changes = replay([
+        ForegroundEvent(1.0, FOREGROUND, 1, 100, 'Inbox'),
+        ForegroundEvent(2.0, FOREGROUND, 1, 100, 'Inbox'),
+        ForegroundEvent(3.0, TITLE, 1, 100, 'Inbox'),
+    ])
+    assert len(changes) == 1
+    assert tracker.current['since'] == 1.0
+
+
+def test_title_change_reuses_process_name():
+    resolved = []
+
+    def resolve(pid):
+        resolved.append(pid)
+        return resolve_process_name(pid)
+
+    replay([
+        ForegroundEvent(1.0, FOREGROUND, 1, 100, 'a'),
+        ForegroundEvent(2.0, TITLE, 1, 100, 'b'),
+        ForegroundEvent(3.0, TITLE, 1, 100, 'c'),
+    ], resolve)
+    assert resolved == [100]
+
+
+def test_unknown_process_and_desktop():
+    tracker, changes = replay([
+        ForegroundEvent(1.0, FOREGROUND, 5, 999, 'gone'),
+        ForegroundEvent(2.0, FOREGROUND, 0, None, ''),
+    ])
+    assert [c['process_name'] for c, _ in changes] == [None, None]
+    assert tracker.current['hwnd'] == 0
+
+
+def test_listener_error_does_not_stop_tracking():
+    tracker = ForegroundTracker(ReplayEventSource([
+        ForegroundEvent(1.0, FOREGROUND, 1, 100, 'a'),
+        ForegroundEvent(2.0, FOREGROUND, 2, 200, 'b'),
+    ]), resolve_process_name=resolve_process_name)
+
+    def broken(current, previous):
+        raise RuntimeError('listener')
+
+    tracker.add_listener(broken)
+    tracker.run()
+    assert tracker.current['process_name'] == 'code.exe'
+
+
+def test_fallback_when_source_fails():
+    class BrokenSource(ForegroundEventSource):
+        def run(self, emit):
+            raise OSError('hook unavailable')
+
+    fallback = ReplayEventSource([ForegroundEvent(1.0, FOREGROUND, 1, 100, 'Inbox')])
+    tracker = ForegroundTracker(BrokenSource(), fallback=fallback, resolve_process_name=resolve_process_name)
+    tracker.run()
+    assert tracker.source is fallback
+    assert tracker.current['process_name'] == 'chrome.exe'
+
+
+def test_replay_stop():
+    source = ReplayEventSource([ForegroundEvent(1.0, FOREGROUND, 1, 100, 'a')])
+    source.stop()
+    tracker = ForegroundTracker(source, resolve_process_name=resolve_process_name)
+    tracker.run()
+    assert tracker.current is None
@@ -0,0 +1,148 @@
+"""从最早版本的数据库结构执行所有迁移"""
+import sqlite3
+
+import pytest
+
+import config
+import migrations
+import retention
+
+# 最早版本 app.py 创建的表，没有 schema_version
+BASELINE_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS app_usage (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        process_name TEXT,
+        window_title TEXT,
+        start_time TEXT,
+        end_time TEXT,
+        is_foreground INTEGER
+    )
+'''
+
+BASELINE_ROWS = [
+    # 旧版本按显示名称写入
+    ('Google Chrome', 'Inbox', '2026-10-01T10:00:00', '2026-10-01T10:30:00', 1),
+    ('记事本', 'todo.txt', '2026-10-01T11:00:00', '2026-10-01T11:10:00', 0),
+    # 升级后按原始名称写入的同一个应用
+    ('chrome.exe', 'Docs', '2026-10-01T10:15:00', '2026-10-01T10:45:00', 1),
+    ('unknown.exe', None, '2026-10-02T09:00:00', None, 0),
+]
+
+
+@pytest.fixture
+def baseline_conn():
+    conn = sqlite3.connect(':memory:')
+    conn.execute(BASELINE_SCHEMA)
+    conn.executemany('''
+        INSERT INTO app_usage (process_name, window_title, start_time, end_time, is_foreground)
+        VALUES (?, ?, ?, ?, ?)
+    ''', BASELINE_ROWS)
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_migrates_baseline_to_latest(baseline_conn):
+    latest = migrations.MIGRATIONS[-1][0]
+    assert migrations.migrate(baseline_conn) == latest
+    assert migrations.get_version(baseline_conn) == latest
+
+    rows = baseline_conn.execute('''
+        SELECT id, process_name, window_title, start_time, end_time, is_foreground
+        FROM usage_view ORDER BY id
+    ''').fetchall()
+    assert rows == [
+        (1, 'chrome.exe', 'Inbox', '2026-10-01T10:00:00', '2026-10-01T10:30:00', 1),
+        (2, 'notepad.exe', 'todo.txt', '2026-10-01T11:00:00', '2026-10-01T11:10:00', 0),
+        (3, 'chrome.exe', 'Docs', '2026-10-01T10:15:00', '2026-10-01T10:45:00', 1),
+        (4, 'unknown.exe', '', '2026-10-02T09:00:00', None, 0),
+    ]
+    names = [name for (name,) in baseline_conn.execute("SELECT name FROM processes")]
+    assert sorted(names) == ['chrome.exe', 'notepad.exe', 'unknown.exe']
+    titles = [title for (title,) in baseline_conn.execute("SELECT title FROM titles")]
+    assert sorted(titles) == ['', 'Docs', 'Inbox', 'todo.txt']
+    indexes = {name for (name,) in baseline_conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'app_usage'")}
+    assert {'idx_app_usage_open', 'idx_app_usage_process_title', 'idx_app_usage_start_time'} <= indexes
+
+
+def test_rollups_merge_display_and_raw_names(baseline_conn):
+    migrations.migrate(baseline_conn)
+    hourly = baseline_conn.execute('''
+        SELECT p.name, h.day, h.hour, h.open_seconds
+        FROM usage_hourly h JOIN processes p ON p.id = h.process_id
+        ORDER BY p.name, h.hour
+    ''').fetchall()
+    assert hourly == [
+        ('chrome.exe', '2026-10-01', 10, 3600.0),
+        ('notepad.exe', '2026-10-01', 11, 600.0),
+    ]
+    daily = baseline_conn.execute('''
+        SELECT p.name, d.open_seconds
+        FROM usage_daily d JOIN processes p ON p.id = d.process_id
+        ORDER BY p.name
+    ''').fetchall()
+    assert daily == [('chrome.exe', 3600.0), ('notepad.exe', 600.0)]
+
+
+def test_drop_focus_usage_id_keeps_intervals(baseline_conn, monkeypatch):
+    monkeypatch.setattr(migrations, 'MIGRATIONS', migrations.MIGRATIONS[:7])
+    migrations.migrate(baseline_conn)
+    baseline_conn.execute('''
+        INSERT INTO focus_intervals (id, usage_id, process_id, title_id, start_time, end_time)
+        VALUES (5, 1, 1, 1, '2026-10-01T10:00:00', NULL)
+    ''')
+    baseline_conn.commit()
+    monkeypatch.undo()
+    migrations.migrate(baseline_conn)
+
+    columns = [row[1] for row in baseline_conn.execute("PRAGMA table_info(focus_intervals)")]
+    assert columns == ['id', 'process_id', 'title_id', 'start_time', 'end_time']
+    assert baseline_conn.execute("SELECT * FROM focus_intervals").fetchall() == [
+        (5, 1, 1, '2026-10-01T10:00:00', None)]
+    indexes = {name for (name,) in baseline_conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'focus_intervals'")}
+    assert indexes == {'idx_focus_intervals_start_time', 'idx_focus_intervals_open'}
+
+
+def test_migrate_is_idempotent(baseline_conn):
+    migrations.migrate(baseline_conn)
+    before = baseline_conn.execute("SELECT COUNT(*) FROM schema_version").fetchone()[0]
+    migrations.migrate(baseline_conn)
+    assert baseline_conn.execute("SELECT COUNT(*) FROM schema_version").fetchone()[0] == before
+
+
+def test_failed_migration_is_rolled_back(baseline_conn, monkeypatch):
+    def broken(conn):
+        conn.execute("CREATE TABLE half_done (id INTEGER)")
+        raise RuntimeError('broken migration')
+
+    monkeypatch.setattr(migrations, 'MIGRATIONS', migrations.MIGRATIONS[:2] + [(3, 'broken', broken)])
+    with pytest.raises(RuntimeError):
+        migrations.migrate(baseline_conn)
+    assert migrations.get_version(baseline_conn) == 2
+    assert baseline_conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE name = 'half_done'").fetchone()[0] == 0
+
+
+def test_prune_titles_keeps_referenced(baseline_conn):
+    migrations.migrate(baseline_conn)
+    baseline_conn.execute("DELETE FROM app_usage WHERE id = 1")
+    baseline_conn.commit()
+    assert retention.prune_titles(baseline_conn) == 1
+    titles = [title for (title,) in baseline_conn.execute("SELECT title FROM titles ORDER BY title")]
+    assert titles == ['', 'Docs', 'todo.txt']
+
+
+def test_prune_titles_does_not_pause_between_batches(baseline_conn, monkeypatch):
+    migrations.migrate(baseline_conn)
+    baseline_conn.execute("DELETE FROM app_usage")
+    baseline_conn.commit()
+    monkeypatch.setattr(config, 'CLEANUP_BATCH_SIZE', 1)
+    monkeypatch.setattr(config, 'CLEANUP_BATCH_PAUSE', 0.05)
+    sleeps = []
+    monkeypatch.setattr(retention.time, 'sleep', sleeps.append)
+    run = retention.CleanupRun('titles')
+    assert retention.prune_titles(baseline_conn, run) == 4
+    assert run.batches == 4
+    assert sleeps == []
@@ -0,0 +1,179 @@
+"""批量写入器
+
+收集一次采样产生的所有新记录和结束时间更新，在同一个事务中用
+executemany 一次写入，并复用长连接，避免每条记录都单独连接、提交。
+进程名称和窗口标题通过驻留缓存转换为字典表 ID 后再写入。
+前台焦点的切换也在同一个事务中写入 focus_intervals 表，
+结束的会话和前台区间同时累加到按小时/天的聚合表中。
+"""
+import datetime
+import time
+
+import retention
+import rollups
+from interning import InternTable
+
+
+class BatchWriter:
+    """按采样批次写入数据库
+
+    Args:
+        connect: 返回 sqlite3 连接的函数，第一次写入时调用，之后复用该连接
+    """
+
+    def __init__(self, connect):
+        self._connect = connect
+        self._conn = None
+        self._data_version = None
+        self.process_ids = InternTable('processes', 'name')
+        self.title_ids = InternTable('titles', 'title')
+        self.inserts = []
+        self.closes = []
+        self.focus_changes = []
+        self.last_batch = {'inserted': 0, 'closed': 0, 'focus': 0, 'commit_ms': 0.0}
+        self.totals = {'batches': 0, 'inserted': 0, 'closed': 0, 'focus': 0, 'commit_ms': 0.0}
+
+    def insert(self, process_name, window_title, start_time, is_foreground):
+        """添加一条新记录"""
+        self.inserts.append((process_name, window_title, start_time.isoformat(), is_foreground))
+
+    def close(self, process_name, window_title, end_time):
+        """添加一条结束时间更新"""
+        self.closes.append((end_time.isoformat(), process_name, window_title))
+
+    def focus(self, process_name, window_title, switch_time):
+        """添加一次焦点切换：结束当前的前台区间，process_name 不为 None 时开始新的区间"""
+        self.focus_changes.append((switch_time.isoformat(), process_name, window_title))
+
+    def flush(self):
+        """在一个事务中写入本批次的所有变化
+
+        Returns:
+            dict: 本批次的统计信息（inserted, closed, focus, commit_ms）
+        """
+        if not self.inserts and not self.closes and not self.focus_changes:
+            self.last_batch = {'inserted': 0, 'closed': 0, 'focus': 0, 'commit_ms': 0.0}
+            return self.last_batch
+
+        if self._conn is None:
+            self._conn = self._connect()
+
+        inserts, closes, focus_changes = self.inserts, self.closes, self.focus_changes
+        self.inserts, self.closes, self.focus_changes = [], [], []
+
+        started = time.perf_counter()
+        conn = self._conn
+        try:
+            with conn:  # 成功则提交，出错则回滚
+                if inserts:
+                    conn.executemany('''
+                        INSERT INTO app_usage (process_id, title_id, start_time, end_time, is_foreground)
+                        VALUES (?, ?, ?, NULL, ?)
+                    ''', [
+                        (self.process_ids.get_id(conn, process_name), self.title_ids.get_id(conn, window_title),
+                         start_time, is_foreground)
+                        for process_name, window_title, start_time, is_foreground in inserts
+                    ])
+                closed_intervals = []
+                focus_intervals = []
+                if closes:
+                    close_rows = [
+                        (end_time, self.process_ids.get_id(conn, process_name), self.title_ids.get_id(conn, window_title))
+                        for end_time, process_name, window_title in closes
+                    ]
+                    # 先读出将要结束的会话，用于更新聚合表
+                    for end_time, process_id, title_id in close_rows:
+                        for (start_time,) in conn.execute('''
+                            SELECT start_time FROM app_usage
+                            WHERE process_id = ? AND title_id = ? AND end_time IS NULL
+                        ''', (process_id, title_id)):
+                            closed_intervals.append((process_id, datetime.datetime.fromisoformat(start_time),
+                                                     datetime.datetime.fromisoformat(end_time)))
+                    conn.executemany('''
+                        UPDATE app_usage
+                        SET end_time = ?
+                        WHERE process_id = ? AND title_id = ? AND end_time IS NULL
+                    ''', close_rows)
+                for switch_time, process_name, window_title in focus_changes:
+                    focus_intervals.extend(self._write_focus(conn, switch_time, process_name, window_title))
+                rollups.add_intervals(conn, closed_intervals, focus_intervals)
+        except Exception:
+            # 连接可能已失效，下次写入时重新连接
+            self.reset()
+            # 新记录和结束时间会在下次采样时重新计算，焦点切换只出现一次，需要保留
+            self.focus_changes = focus_changes + self.focus_changes
+            raise
+        commit_ms = (time.perf_counter() - started) * 1000
+
+        self.last_batch = {'inserted': len(inserts), 'closed': len(closes),
+                           'focus': len(focus_changes), 'commit_ms': commit_ms}
+        self.totals['batches'] += 1
+        self.totals['inserted'] += len(inserts)
+        self.totals['closed'] += len(closes)
+        self.totals['focus'] += len(focus_changes)
+        self.totals['commit_ms'] += commit_ms
+        return self.last_batch
+
+    def _write_focus(self, conn, switch_time, process_name, window_title):
+        """结束当前的前台区间并开始新的区间
+
+        前台区间不记录对应的 app_usage 行，需要时按 (process_id, title_id) 和时间重叠关联
+
+        Returns:
+            list: 被结束的前台区间 [(process_id, start, end)]
+        """
+        end = datetime.datetime.fromisoformat(switch_time)
+        ended = [
+            (process_id, datetime.datetime.fromisoformat(start_time), end)
+            for process_id, start_time in conn.execute(
+                "SELECT process_id, start_time FROM focus_intervals WHERE end_time IS NULL")
+        ]
+        conn.execute("UPDATE focus_intervals SET end_time = ? WHERE end_time IS NULL", (switch_time,))
+        if process_name is None:
+            return ended
+        process_id = self.process_ids.get_id(conn, process_name)
+        title_id = self.title_ids.get_id(conn, window_title)
+        conn.execute('''
+            INSERT INTO focus_intervals (process_id, title_id, start_time, end_time)
+            VALUES (?, ?, ?, NULL)
+        ''', (process_id, title_id, switch_time))
+        return ended
+
+    def changed_externally(self):
+        """其他连接自上次调用以来是否提交过修改（PRAGMA data_version）
+
+        第一次调用和重新连接后总是返回 True
+        """
+        if self._conn is None:
+            self._conn = self._connect()
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        changed = version != self._data_version
+        self._data_version = version
+        return changed
+
+    def prune_titles(self, run=None):
+        """删除不再被引用的窗口标题并清空标题缓存
+
+        必须在调用 flush 的线程中执行：标题引用只由这个写入器写入，删除期间不会出现新的引用
+
+        Returns:
+            int: 删除的标题数
+        """
+        if self._conn is None:
+            self._conn = self._connect()
+        try:
+            return retention.prune_titles(self._conn, run)
+        finally:
+            self.title_ids.clear()
+
+    def reset(self):
+        """关闭长连接并清空驻留缓存（回滚的事务中可能插入过字典表）"""
+        self.process_ids.clear()
+        self.title_ids.clear()
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+        self._data_version = None